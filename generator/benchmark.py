@@ -0,0 +1,203 @@
+"""
+Benchmark du pipeline de main.py sur un corpus (voir generator/corpus.py).
+
+Mesure le debit (fichiers/s, Mo/s), le pic de memoire (RSS) et, en mode
+sequentiel, les percentiles de latence par format. Chaque execution est
+ajoutee a un fichier JSON Lines avec le commit courant, pour comparer les
+resultats entre deux commits.
+
+Usage (depuis la racine du depot, avec -m pour que utils/ et metadata_readers/
+soient importables ; benchmarks.jsonl et corpus/ sont ignores par git):
+        python3 -m generator.corpus corpus/ --count 200
+        python3 -m generator.benchmark corpus/ --repeat 3
+        python3 -m generator.benchmark corpus/ --jobs 4 --compare
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from utils.printer import OUTPUT_FORMATS, make_writer
+from utils.processing import process_file, process_files
+from utils.walker import iter_files
+
+DEFAULT_RESULTS = "benchmarks.jsonl"
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values, p: int):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss est en Ko sous Linux (en octets sous macOS)
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return peak * scale / 1e6
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_once(files, jobs: int, output_format: str):
+    """
+    Runs the pipeline once over `files`, output written to /dev/null.
+
+    Returns:
+            tuple: (elapsed seconds, {format: [latency ns, ...]}). Latencies
+                    are only measured when jobs == 1 (per process_file call).
+    """
+    latencies = defaultdict(list)
+    with open(os.devnull, "w") as devnull, make_writer(output_format, devnull) as w:
+        start = time.perf_counter_ns()
+        if jobs == 1:
+            for file in files:
+                file_start = time.perf_counter_ns()
+                result = process_file(file)
+                latencies[result[1]].append(time.perf_counter_ns() - file_start)
+                w.write(*result)
+        else:
+            for result in process_files(files, jobs):
+                w.write(*result)
+        elapsed = (time.perf_counter_ns() - start) / 1e9
+    return elapsed, latencies
+
+
+def benchmark(paths, jobs: int = 1, repeat: int = 3, output_format: str = "text"):
+    """
+    Benchmarks the pipeline and returns a JSON-serialisable record.
+
+    The best of `repeat` runs is kept for throughput (least disturbed by
+    the rest of the system); latencies of every run are merged.
+    """
+    files = list(iter_files(paths, recursive=True))
+    total_bytes = sum(os.path.getsize(file) for file in files)
+
+    best = None
+    merged = defaultdict(list)
+    for _ in range(repeat):
+        elapsed, latencies = run_once(files, jobs, output_format)
+        best = elapsed if best is None else min(best, elapsed)
+        for file_format, values in latencies.items():
+            merged[file_format].extend(values)
+
+    latency_report = {}
+    for file_format, values in sorted(merged.items()):
+        values.sort()
+        latency_report[file_format] = {
+            "count": len(values) // repeat,
+            **{f"p{p}_us": percentile(values, p) / 1000 for p in PERCENTILES},
+        }
+
+    return {
+        "commit": _git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "paths": list(paths),
+        "jobs": jobs,
+        "format": output_format,
+        "repeat": repeat,
+        "files": len(files),
+        "bytes": total_bytes,
+        "seconds": round(best, 6),
+        "files_per_sec": round(len(files) / best, 1) if best else None,
+        "mb_per_sec": round(total_bytes / 1e6 / best, 1) if best else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "latency": latency_report,
+    }
+
+
+def load_previous(results_path: str, record: dict):
+    """Returns the last record of `results_path` with the same settings from another commit."""
+    if not os.path.exists(results_path):
+        return None
+    previous = None
+    with open(results_path) as f:
+        for line in f:
+            old = json.loads(line)
+            same_run = all(
+                old.get(key) == record[key] for key in ("paths", "jobs", "format")
+            )
+            if same_run and old.get("commit") != record["commit"]:
+                previous = old
+    return previous
+
+
+def print_report(record: dict, previous: dict | None = None):
+    def delta(key):
+        if not previous or not previous.get(key):
+            return ""
+        change = (record[key] - previous[key]) / previous[key] * 100
+        return f"  ({change:+.1f}% vs {previous['commit']})"
+
+    print(
+        f"commit {record['commit']}, jobs={record['jobs']}, format={record['format']}"
+    )
+    print(f"{record['files']} files, {record['bytes'] / 1e6:.1f} MB")
+    print(f"files/sec   : {record['files_per_sec']}{delta('files_per_sec')}")
+    print(f"MB/sec      : {record['mb_per_sec']}{delta('mb_per_sec')}")
+    print(f"peak RSS MB : {record['peak_rss_mb']}{delta('peak_rss_mb')}")
+    if record["latency"]:
+        header = "".join(f"{f'p{p} (us)':>12}" for p in PERCENTILES)
+        print(f"\n{'format':<10}{'files':>8}{header}")
+        for file_format, stats in record["latency"].items():
+            values = "".join(f"{stats[f'p{p}_us']:>12.1f}" for p in PERCENTILES)
+            print(f"{file_format:<10}{stats['count']:>8}{values}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline de main.py")
+    parser.add_argument("paths", nargs="+", help="Fichiers ou dossiers du corpus")
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="text")
+    parser.add_argument(
+        "--results",
+        default=DEFAULT_RESULTS,
+        help="Fichier JSON Lines ou les resultats sont ajoutes (defaut: %(default)s)",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Compare au dernier resultat d'un autre commit (memes reglages)",
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help="N'ajoute pas le resultat au fichier"
+    )
+    args = parser.parse_args()
+    if args.jobs < 1 or args.repeat < 1:
+        parser.error("--jobs and --repeat must be >= 1")
+
+    record = benchmark(args.paths, args.jobs, args.repeat, args.format)
+    previous = load_previous(args.results, record) if args.compare else None
+    print_report(record, previous)
+    if not args.no_save:
+        with open(args.results, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Generateur de corpus synthetique pour les benchmarks (voir generator/benchmark.py).
+
+Les fichiers sont ecrits directement avec struct / zlib, sans Pillow, pour
+controler exactement ce que les lecteurs parcourent : dimensions, nombre
+de frames GIF, densite EXIF, nombre de chunks texte PNG, version d'en-tete
+BMP. Les donnees d'image sont aleatoires : les fichiers sont valides pour
+les lecteurs de metadonnees (structure, longueurs) mais les pixels JPEG /
+GIF ne se decodent pas.
+
+Usage:
+        python3 -m generator.corpus corpus/ --count 200 --width 1920 --height 1080 \\
+                --frames 50 --exif-entries 40 --text-chunks 10 --bmp-header v5
+"""
+
+import argparse
+import os
+import random
+import struct
+import zlib
+
+FORMATS = ("jpeg", "png", "gif", "bmp")
+
+# Version d'en-tete BMP -> taille du DIB header
+BMP_HEADERS = {"core": 12, "v3": 40, "v4": 108, "v5": 124}
+
+# Tags EXIF realistes de l'IFD Exif : (tag, type, valeur)
+EXIF_TEMPLATES = (
+    (0x829A, 5, ((1, 125),)),  # ExposureTime
+    (0x829D, 5, ((28, 10),)),  # FNumber
+    (0x8827, 3, (200,)),  # ISOSpeedRatings
+    (0x9003, 2, "2024:01:01 10:00:00"),  # DateTimeOriginal
+    (0x9004, 2, "2024:01:01 10:00:00"),  # DateTimeDigitized
+    (0x920A, 5, ((50, 1),)),  # FocalLength
+    (0x9286, 7, b"ASCII\x00\x00\x00synthetic corpus"),  # UserComment
+    (0xA420, 2, "0123456789abcdef0123456789abcdef"),  # ImageUniqueID
+)
+
+# Types TIFF utilises : type -> format struct d'une valeur
+TIFF_FORMATS = {2: "s", 3: "H", 4: "I", 5: "II", 7: "s"}
+
+
+def _tiff_entries(entries, endian: str, data_offset: int):
+    """
+    Builds an IFD: entry table + out-of-line values.
+
+    Args:
+            entries (list): (tag, type, value) sorted by tag. `value` is a str
+                    (ASCII), bytes (UNDEFINED) or a tuple of numbers / pairs.
+            data_offset (int): Offset of the IFD in the TIFF structure.
+
+    Returns:
+            bytes: The IFD (next IFD offset = 0), followed by its values.
+    """
+    table_size = 2 + 12 * len(entries) + 4
+    table = struct.pack(endian + "H", len(entries))
+    values = b""
+    for tag, typ, value in entries:
+        if typ == 2:
+            raw = value.encode("ascii") + b"\x00"
+            count = len(raw)
+        elif typ == 7:
+            raw = value
+            count = len(raw)
+        else:
+            flat = [v for item in value for v in (item if typ == 5 else (item,))]
+            raw = struct.pack(endian + TIFF_FORMATS[typ] * len(value), *flat)
+            count = len(value)
+        if len(raw) <= 4:
+            table += struct.pack(endian + "HHI", tag, typ, count) + raw.ljust(4, b"\0")
+        else:
+            offset = data_offset + table_size + len(values)
+            table += struct.pack(endian + "HHII", tag, typ, count, offset)
+            values += raw + b"\x00" * (len(raw) & 1)
+    return table + struct.pack(endian + "I", 0) + values
+
+
+def make_exif(entries: int, rng: random.Random, endian: str = "<") -> bytes:
+    """
+    Builds an EXIF TIFF structure: IFD0 (Make, Model, DateTime), an Exif
+    IFD with `entries` tags and a GPS IFD.
+
+    The first entries come from EXIF_TEMPLATES, the others are private
+    tags (0xC000 + n) holding short ASCII strings.
+    """
+    exif = [EXIF_TEMPLATES[i] for i in range(min(entries, len(EXIF_TEMPLATES)))]
+    for n in range(entries - len(exif)):
+        exif.append((0xC000 + n, 2, f"value {rng.randrange(1 << 30):08x}"))
+    exif.sort()
+    gps = [
+        (0x0001, 2, "N"),
+        (0x0002, 5, ((34, 1), (3, 1), (rng.randrange(60), 1))),
+        (0x0003, 2, "W"),
+        (0x0004, 5, ((118, 1), (14, 1), (rng.randrange(60), 1))),
+    ]
+
+    header = (b"II" if endian == "<" else b"MM") + struct.pack(endian + "HI", 42, 8)
+    # Taille de l'IFD0 : 5 entrees, puis ses valeurs
+    ifd0_entries = [
+        (0x010F, 2, "Scorpion"),
+        (0x0110, 2, "Synthetic Camera"),
+        (0x0132, 2, "2024:01:01 10:00:00"),
+        (0x8769, 4, (0,)),
+        (0x8825, 4, (0,)),
+    ]
+    ifd0_size = len(_tiff_entries(ifd0_entries, endian, 8))
+    exif_offset = 8 + ifd0_size
+    exif_ifd = _tiff_entries(exif, endian, exif_offset)
+    gps_offset = exif_offset + len(exif_ifd)
+    ifd0_entries[3] = (0x8769, 4, (exif_offset,))
+    ifd0_entries[4] = (0x8825, 4, (gps_offset,))
+    ifd0 = _tiff_entries(ifd0_entries, endian, 8)
+    return header + ifd0 + exif_ifd + _tiff_entries(gps, endian, gps_offset)
+
+
+def make_jpeg(width, height, exif_entries, rng) -> bytes:
+    # SOI, APP1 Exif, SOF0, SOS + donnees d'entropie aleatoires, EOI
+    data = b"\xff\xd8"
+    if exif_entries:
+        payload = b"Exif\x00\x00" + make_exif(exif_entries, rng, rng.choice("<>"))
+        data += b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+    sof = (
+        struct.pack(">BHHB", 8, height, width, 3)
+        + b"\x01\x22\x00\x02\x11\x01\x03\x11\x01"
+    )
+    data += b"\xff\xc0" + struct.pack(">H", len(sof) + 2) + sof
+    sos = b"\x03\x01\x00\x02\x11\x03\x11\x00\x3f\x00"
+    data += b"\xff\xda" + struct.pack(">H", len(sos) + 2) + sos
+    # Environ 1 octet pour 10 pixels (JPEG de qualite moyenne), sans 0xFF
+    scan = rng.randbytes(max(1, width * height // 10)).replace(b"\xff", b"\x00")
+    return data + scan + b"\xff\xd9"
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(chunk_type + data)
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+def make_png(width, height, text_chunks, exif_entries, rng) -> bytes:
+    data = b"\x89PNG\r\n\x1a\n"
+    data += _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    data += _png_chunk(b"pHYs", struct.pack(">IIB", 2835, 2835, 1))
+    for n in range(text_chunks):
+        text = f"synthetic text {n} ".encode() * 8
+        if n % 2:
+            data += _png_chunk(b"zTXt", b"Comment%d\x00\x00" % n + zlib.compress(text))
+        else:
+            data += _png_chunk(b"tEXt", b"Title%d\x00" % n + text)
+    if exif_entries:
+        data += _png_chunk(b"eXIf", make_exif(exif_entries, rng, ">"))
+    # Lignes aleatoires (filtre 0) : la taille compressee reste proche de
+    # celle des pixels, comme une photo.
+    row = width * 3
+    raw = b"".join(b"\x00" + rng.randbytes(row) for _ in range(height))
+    data += _png_chunk(b"IDAT", zlib.compress(raw, 1))
+    return data + _png_chunk(b"IEND", b"")
+
+
+def _gif_sub_blocks(payload: bytes) -> bytes:
+    blocks = b"".join(
+        bytes((len(payload[i : i + 255]),)) + payload[i : i + 255]
+        for i in range(0, len(payload), 255)
+    )
+    return blocks + b"\x00"
+
+
+def make_gif(width, height, frames, rng) -> bytes:
+    # Table de couleurs globale de 256 entrees
+    data = b"GIF89a" + struct.pack("<HHBBB", width, height, 0xF7, 0, 0)
+    data += rng.randbytes(3 * 256)
+    data += b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00"
+    data += b"\x21\xfe" + _gif_sub_blocks(b"synthetic corpus")
+    # Donnees LZW aleatoires : environ la moitie des pixels de chaque frame
+    frame_size = max(1, width * height // 2)
+    for _ in range(frames):
+        delay = rng.choice((2, 4, 10))
+        data += b"\x21\xf9\x04" + struct.pack("<BHB", 0x05, delay, 0) + b"\x00"
+        data += b"\x2c" + struct.pack("<HHHHB", 0, 0, width, height, 0)
+        data += b"\x08" + _gif_sub_blocks(rng.randbytes(frame_size))
+    return data + b"\x3b"
+
+
+def make_bmp(width, height, header, rng) -> bytes:
+    header_size = BMP_HEADERS[header]
+    row = (width * 3 + 3) & ~3
+    pixels = rng.randbytes(row * height)
+    offset = 14 + header_size
+    if header == "core":
+        dib = struct.pack("<IHHHH", 12, width, height, 1, 24)
+    else:
+        dib = struct.pack(
+            "<IiiHHIIiiII",
+            header_size,
+            width,
+            height,
+            1,
+            24,
+            0,
+            len(pixels),
+            2835,
+            2835,
+            0,
+            0,
+        )
+        if header_size >= 108:
+            # Masques RGBA, espace couleur sRGB, endpoints et gammas a zero
+            dib += struct.pack("<IIII", 0xFF0000, 0xFF00, 0xFF, 0)
+            dib += b"BGRs" + b"\x00" * 48
+        if header_size >= 124:
+            # Intent, profil ICC (offset, taille), reserve
+            dib += struct.pack("<IIII", 4, 0, 0, 0)
+    file_header = b"BM" + struct.pack("<IHHI", offset + len(pixels), 0, 0, offset)
+    return file_header + dib + pixels
+
+
+def generate(
+    directory: str,
+    count: int = 100,
+    formats=FORMATS,
+    width: int = 640,
+    height: int = 480,
+    frames: int = 10,
+    exif_entries: int = 20,
+    text_chunks: int = 4,
+    bmp_header: str = "v3",
+    seed: int = 0,
+):
+    """
+    Writes `count` files per format in `directory`.
+
+    Args:
+            formats (iterable[str]): Formats among FORMATS.
+            width, height (int): Dimensions of every image.
+            frames (int): Frames per GIF.
+            exif_entries (int): Tags of the Exif IFD (JPEG APP1 and PNG eXIf,
+                    0 for none).
+            text_chunks (int): tEXt / zTXt chunks per PNG.
+            bmp_header (str): BMP DIB header version (see BMP_HEADERS).
+            seed (int): Seed of the random data: a corpus is reproducible.
+
+    Returns:
+            int: Total number of bytes written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    builders = {
+        "jpeg": ("jpg", lambda: make_jpeg(width, height, exif_entries, rng)),
+        "png": ("png", lambda: make_png(width, height, text_chunks, exif_entries, rng)),
+        "gif": ("gif", lambda: make_gif(width, height, frames, rng)),
+        "bmp": ("bmp", lambda: make_bmp(width, height, bmp_header, rng)),
+    }
+    total = 0
+    for file_format in formats:
+        extension, build = builders[file_format]
+        for n in range(count):
+            data = build()
+            path = os.path.join(directory, f"{file_format}_{n:05d}.{extension}")
+            with open(path, "wb") as f:
+                f.write(data)
+            total += len(data)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Genere un corpus synthetique JPEG / PNG / GIF / BMP"
+    )
+    parser.add_argument("directory", help="Dossier de sortie")
+    parser.add_argument("--count", type=int, default=100, help="Fichiers par format")
+    parser.add_argument(
+        "--formats", default=",".join(FORMATS), help="Formats, separes par des virgules"
+    )
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--frames", type=int, default=10, help="Frames par GIF")
+    parser.add_argument(
+        "--exif-entries", type=int, default=20, help="Tags EXIF (JPEG, PNG eXIf)"
+    )
+    parser.add_argument("--text-chunks", type=int, default=4, help="Chunks texte PNG")
+    parser.add_argument("--bmp-header", choices=BMP_HEADERS, default="v3")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+    for file_format in formats:
+        if file_format not in FORMATS:
+            parser.error(f"unknown format: {file_format}")
+    total = generate(
+        args.directory,
+        count=args.count,
+        formats=formats,
+        width=args.width,
+        height=args.height,
+        frames=args.frames,
+        exif_entries=args.exif_entries,
+        text_chunks=args.text_chunks,
+        bmp_header=args.bmp_header,
+        seed=args.seed,
+    )
+    print(
+        f"{args.count * len(formats)} files, {total / 1e6:.1f} MB -> {args.directory}"
+    )
+
+
+if __name__ == "__main__":
+    main()
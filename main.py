@@ -1,81 +1,526 @@
 import argparse
 import os
-from metadata_readers.GifReader import GifReader
-from metadata_readers.BmpReader import BmpReader, BmpInfos
-from metadata_readers.PngReader import PngReader
-from metadata_readers.JpgReader import JPGParser
-from utils.printer import print_metadata
+import sys
+import time
+from functools import partial
+from metadata_readers.registry import preload
+from utils.archive import ARCHIVE_PATTERNS
+from utils.budget import parse_budget
+from utils.cache import DEFAULT_CACHE_SIZE
+from utils.fields import parse_fields
+from utils.printer import OUTPUT_FORMATS, make_writer
+from utils.processing import (
+    process_content,
+    process_data,
+    process_file,
+    process_files,
+    process_item,
+    profile_file,
+    project_result,
+)
+from utils.profiler import PROFILE_FORMATS, StageProfiler
+from utils.walker import SYMLINK_POLICIES, iter_files
+from utils.watcher import (
+    DEFAULT_DEBOUNCE,
+    DEFAULT_POLL_INTERVAL,
+    WATCH_BACKENDS,
+)
+
+# Au-dela de cette taille, le mode --async ne charge pas le fichier en
+# memoire dans un thread de lecture : il est lu depuis le disque au parsing.
+ASYNC_MAX_READ = 16 * 1024 * 1024
+# Octets lus et pas encore analyses en mode --async (lectures en cours
+# comprises), quels que soient --inflight et --queue-size
+ASYNC_MAX_BUFFERED = 64 * 1024 * 1024
 
 
 def init_arg_parse():
     parser = argparse.ArgumentParser(
         description="Analyse and extract metadata from file(s)"
     )
-    parser.add_argument("files", nargs="+", help="Un ou plusieurs fichiers a analyser")
+    parser.add_argument(
+        "files", nargs="*", help="Un ou plusieurs fichiers (ou dossiers avec -r)"
+    )
+    parser.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="Parcourt les dossiers donnes et leurs sous-dossiers",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="PATTERN",
+        help="Avec -r, ne garde que les fichiers correspondant au motif "
+        "(ex: '*.jpg', repetable)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="PATTERN",
+        help="Avec -r, ignore les fichiers et dossiers correspondant au motif "
+        "(repetable)",
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=None,
+        help="Avec -r, profondeur maximale de sous-dossiers (0 = pas de sous-dossier)",
+    )
+    parser.add_argument(
+        "--symlinks",
+        choices=SYMLINK_POLICIES,
+        default="files",
+        help="Avec -r, liens symboliques : ignores (skip), suivis vers les "
+        "fichiers seulement (files, defaut) ou aussi vers les dossiers (follow)",
+    )
+    parser.add_argument(
+        "--archives",
+        action="store_true",
+        help="Analyse les fichiers contenus dans les archives zip et tar "
+        "(.tar.gz, ...) sans les extraire, affiches 'archive.zip!membre'",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Nombre de processus d'extraction en parallele (defaut: 1)",
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="Avec --jobs, affiche les resultats des qu'ils sont prets "
+        "au lieu de l'ordre des fichiers",
+    )
+
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Pipeline asyncio : les lectures de fichiers (threads) se font "
+        "pendant le parsing des fichiers deja lus (utile sur NFS)",
+    )
+    parser.add_argument(
+        "--inflight",
+        type=int,
+        default=16,
+        help="Avec --async, nombre maximal de lectures en cours ; avec "
+        "--connect, de requetes en cours (defaut: 16)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=64,
+        help="Avec --async, taille des files d'attente entre etapes (defaut: 64)",
+    )
+    parser.add_argument(
+        "--fields",
+        action="append",
+        metavar="FIELD[,FIELD...]",
+        help="N'extrait que ces champs (ex: 'dimensions', 'DPI', 'GPSInfo', "
+        "'DateTimeOriginal') : les lecteurs s'arretent des qu'ils les ont trouves",
+    )
+    parser.add_argument(
+        "--max-bytes",
+        type=int,
+        metavar="N",
+        help="Octets lus au maximum par fichier : au-dela, l'analyse est "
+        "interrompue et le fichier signale 'Aborted' (entrees hostiles)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Duree maximale d'analyse par fichier, meme resultat 'Aborted'",
+    )
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="text",
+        help="Format de sortie : texte lisible (defaut), JSON Lines ou CSV",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Mesure le temps de chaque etape (open, identify, load, parse, "
+        "output) par fichier et affiche un resume par format sur stderr",
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=PROFILE_FORMATS,
+        default="table",
+        help="Avec --profile, resume en tableau (defaut) ou en JSON",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Traite les fichiers presents, puis surveille les fichiers / "
+        "dossiers donnes et n'analyse que ceux qui sont crees ou modifies "
+        "(evenements add / update / delete)",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_DEBOUNCE,
+        metavar="SECONDS",
+        help="Avec --watch, delai sans modification avant de traiter un "
+        "fichier (defaut: %(default)s)",
+    )
+    parser.add_argument(
+        "--watch-backend",
+        choices=WATCH_BACKENDS,
+        default="auto",
+        help="Avec --watch, inotify (Linux) ou parcours periodique ; auto "
+        "utilise inotify s'il est disponible (defaut)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        metavar="SECONDS",
+        help="Avec --watch en mode poll, intervalle entre deux parcours "
+        "(defaut: %(default)s)",
+    )
+    parser.add_argument(
+        "--connect",
+        metavar="SOCKET",
+        help="Envoie les fichiers a un serveur 'main.py serve' au lieu de les "
+        "analyser dans ce processus (meme sortie)",
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="DB",
+        help="Fichier SQLite de cache des metadonnees : les fichiers inchanges "
+        "(device, inode, taille, mtime) ne sont pas relus",
+    )
+    parser.add_argument(
+        "--cache-max-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        metavar="MB",
+        help="Taille maximale du cache en Mo, les entrees les moins "
+        "recemment utilisees sont supprimees (defaut: %(default)s)",
+    )
+    parser.add_argument(
+        "--invalidate-cache",
+        action="store_true",
+        help="Supprime du cache les entrees des fichiers / dossiers donnes, "
+        "sans extraction",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Vide entierement le cache, sans extraction",
+    )
 
     args = parser.parse_args()
-    return args.files
+    if args.jobs < 1:
+        parser.error("--jobs must be >= 1")
+    if (args.invalidate_cache or args.clear_cache) and not args.cache:
+        parser.error("--invalidate-cache and --clear-cache require --cache")
+    if args.use_async and (args.jobs > 1 or args.cache):
+        parser.error("--async cannot be combined with --jobs or --cache")
+    if args.profile and (args.use_async or args.cache):
+        parser.error("--profile cannot be combined with --async or --cache")
+    if args.watch and (args.use_async or args.profile):
+        parser.error("--watch cannot be combined with --async or --profile")
+    if args.connect and (
+        args.use_async or args.profile or args.watch or args.cache or args.jobs > 1
+    ):
+        parser.error(
+            "--connect cannot be combined with --async, --profile, --watch, "
+            "--cache or --jobs"
+        )
+    if args.archives and (args.use_async or args.profile or args.watch or args.connect):
+        parser.error(
+            "--archives cannot be combined with --async, --profile, --watch "
+            "or --connect"
+        )
+    if args.debounce < 0 or args.poll_interval <= 0:
+        parser.error("--debounce must be >= 0 and --poll-interval > 0")
+    if (args.max_bytes is not None and args.max_bytes < 1) or (
+        args.timeout is not None and args.timeout <= 0
+    ):
+        parser.error("--max-bytes and --timeout must be > 0")
+    if args.inflight < 1 or args.queue_size < 1:
+        parser.error("--inflight and --queue-size must be >= 1")
+    if not args.files and not args.clear_cache:
+        parser.error("the following arguments are required: files")
+    return args
+
+
+def init_serve_parse(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py serve",
+        description="Resident extraction server on a Unix socket (see "
+        "utils/server.py), used with 'main.py --connect SOCKET'",
+    )
+    parser.add_argument("socket", help="Chemin du socket Unix a creer")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Nombre de processus d'analyse, demarres une seule fois "
+        "(defaut: nombre de CPU)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=64,
+        help="Requetes en attente d'un processus libre, au-dela le serveur "
+        "repond 'server busy' (defaut: 64)",
+    )
+    parser.add_argument(
+        "--max-bytes",
+        type=int,
+        metavar="N",
+        help="Nombre maximal d'octets lus par fichier",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Duree maximale d'analyse par fichier",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 1 or args.queue_size < 0:
+        parser.error("--jobs must be >= 1 and --queue-size >= 0")
+    if (args.max_bytes is not None and args.max_bytes < 1) or (
+        args.timeout is not None and args.timeout <= 0
+    ):
+        parser.error("--max-bytes and --timeout must be > 0")
+    return args
+
+
+def buffered_size(file: str) -> int:
+    """Bytes that read_file() will keep in memory for `file` (--async)."""
+    size = os.stat(file).st_size
+    return size if size <= ASYNC_MAX_READ else 0
 
 
-def identify_file_type(data: bytes):
-    if data.startswith(b"\x89PNG\r\n\x1a\n"):
-        return "PNG"
-    elif data.startswith(b"BM"):
-        return "BMP"
-    elif data.startswith(b"GIF87a") or data.startswith(b"GIF89a"):
-        return "GIF"
-    elif data.startswith(b"\xff\xd8\xff"):
-        return "JPEG"
-    else:
-        return "UNKNOWN"
+def read_file(file: str) -> bytes | None:
+    """
+    Reads a whole file for the --async pipeline (runs in a reader thread).
 
+    Returns:
+            bytes|None: Content of the file, None if it is larger than
+                    ASYNC_MAX_READ (it is then parsed from disk by process_file).
+    """
+    with open(file, "rb") as f:
+        if os.fstat(f.fileno()).st_size > ASYNC_MAX_READ:
+            return None
+        return f.read()
 
-def extract_gif(data: bytes, filename: str):
-    extractor = GifReader(data, filename)
-    metadata = extractor.run()
-    print_metadata(filename, "GIF", extractor.infos)
 
+def run_profiled(files, args, fields, budget, writer):
+    """--profile: runs the batch with profile_file() and prints the timing summary on stderr."""
+    profiler = StageProfiler()
+    clock = time.perf_counter_ns
+    start = clock()
+    for result, timings in process_files(
+        files,
+        args.jobs,
+        ordered=not args.unordered,
+        fields=fields,
+        budget=budget,
+        worker=profile_file,
+    ):
+        output_start = clock()
+        writer.write(*project_result(result, fields))
+        timings["output"] = clock() - output_start
+        profiler.add(result[1], timings)
+    writer.close()
+    profiler.report(sys.stderr, args.profile_format, elapsed_ns=clock() - start)
 
-def extract_jpg(data: bytes, filename: str):
-    parser = JPGParser(filename)
-    metadata = parser.run()
-    print_metadata(filename, "JPEG", metadata)
 
+def run_watch(args, fields, budget, cache, writer):
+    """
+    --watch: extracts the files already present ("add" events), then only
+    the files created or modified afterwards, as their changes settle.
 
-def extract_bmp(data: bytes, filename: str):
-    extractor = BmpReader(data, filename)
-    metadata = extractor.run()
-    print_metadata(filename, "BMP", metadata.bmp_header_info)
+    Changed files go through process_files() (same --jobs, --cache,
+    --fields and budget handling as a normal run); deleted files are
+    reported with writer.write_deleted() and dropped from the cache.
+    Runs until interrupted (Ctrl-C).
+    """
+    from utils.watcher import make_watcher
 
+    watcher = make_watcher(
+        args.files,
+        backend=args.watch_backend,
+        poll_interval=args.poll_interval,
+        recursive=args.recursive,
+        include=args.include,
+        exclude=args.exclude,
+        max_depth=args.max_depth,
+        symlinks=args.symlinks,
+        debounce=args.debounce,
+    )
+
+    def extract(paths, events):
+        for result in process_files(
+            paths,
+            args.jobs,
+            ordered=not args.unordered,
+            cache=cache,
+            fields=fields,
+            budget=budget,
+        ):
+            writer.write(*project_result(result, fields), event=events[result[0]])
+
+    with watcher:
+        files = watcher.scan()
+        extract(files, dict.fromkeys(files, "add"))
+        writer.flush()
+        try:
+            for batch in watcher.batches():
+                events = {path: event for event, path in batch}
+                extract([path for event, path in batch if event != "delete"], events)
+                deleted = [path for event, path in batch if event == "delete"]
+                for path in deleted:
+                    writer.write_deleted(path)
+                if deleted and cache is not None:
+                    cache.invalidate(deleted)
+                writer.flush()
+        except KeyboardInterrupt:
+            pass
+
+
+def serve(argv):
+    # asyncio et le serveur ne sont importes que par les commandes qui s'en
+    # servent : le demarrage d'une analyse simple reste rapide
+    import asyncio
+    from utils.server import ExtractionServer
+
+    args = init_serve_parse(argv)
+    server = ExtractionServer(
+        args.socket,
+        process_file,
+        process_content,
+        project_result,
+        jobs=args.jobs,
+        queue_size=args.queue_size,
+        budget=parse_budget(args.max_bytes, args.timeout),
+        initializer=preload,
+    )
+    print(f"Listening on {args.socket} ({args.jobs} workers)", file=sys.stderr)
+    try:
+        asyncio.run(server.serve())
+    except OSError as e:
+        sys.exit(f"main.py serve: {e}")
 
-def extract_png(data: bytes, filename: str):
-    extractor = PngReader(data, filename)
-    metadata = extractor.run()
-    print_metadata(filename, "PNG", extractor.img_info)
 
+def run_client(files, args, writer):
+    """
+    --connect: the files are analysed by a 'main.py serve' process, which
+    renders the records in the --format of this process. Only the
+    connection errors differ from a local run.
+    """
+    from utils.server import ExtractionClient
 
-def error_extension(data, filename):
-    print(f"Error while extracting {filename}, extension of file unknown")
+    try:
+        client = ExtractionClient(args.connect)
+    except OSError as e:
+        sys.exit(f"Cannot connect to {args.connect}: {e}")
+    with client:
+        for response in client.extract_paths(
+            files,
+            render=args.format,
+            fields=args.fields,
+            window=args.inflight,
+            ordered=not args.unordered,
+        ):
+            if "output" in response:
+                writer.stream.write(response["output"])
+            else:
+                writer.write(response["path"], "ERROR", response["error"])
 
 
 def main():
-    files = init_arg_parse()
-
-    ext_to_ft = {
-        "BMP": extract_bmp,
-        "GIF": extract_gif,
-        "PNG": extract_png,
-        "JPEG": extract_jpg,
-        "UNKNOWN": error_extension,
-    }
-
-    for file in files:
-        if not os.path.isfile(file):
-            continue
-        with open(file, "rb") as f:
-            data = f.read()
-            extension = identify_file_type(data)
-            ext_to_ft[extension](data, file)
+    if sys.argv[1:2] == ["serve"]:
+        serve(sys.argv[2:])
+        return
+    args = init_arg_parse()
+    fields = parse_fields(args.fields)
+    budget = parse_budget(args.max_bytes, args.timeout)
+
+    cache = None
+    if args.cache:
+        from utils.cache import MetadataCache
+
+        cache = MetadataCache(args.cache, args.cache_max_size * 1024 * 1024)
+        if args.clear_cache:
+            cache.clear()
+            cache.close()
+            return
+        if args.invalidate_cache:
+            removed = cache.invalidate(args.files)
+            cache.close()
+            print(f"{removed} cache entries invalidated")
+            return
+
+    include = args.include
+    if args.archives and include:
+        # Les archives sont parcourues meme si elles ne correspondent pas a
+        # --include, qui s'applique alors a leurs membres
+        include = [*include, *ARCHIVE_PATTERNS]
+    files = iter_files(
+        args.files,
+        recursive=args.recursive,
+        include=include,
+        exclude=args.exclude,
+        max_depth=args.max_depth,
+        symlinks=args.symlinks,
+    )
+    worker = process_file
+    if args.archives:
+        from utils.archive import expand_archives
+
+        files = expand_archives(files, args.include, args.exclude)
+        worker = process_item
+    try:
+        with make_writer(args.format, events=args.watch) as writer:
+            if args.use_async:
+                import asyncio
+                from utils.pipeline import run_pipeline
+
+                asyncio.run(
+                    run_pipeline(
+                        files,
+                        read_file,
+                        partial(process_data, fields=fields, budget=budget),
+                        lambda result: writer.write(*project_result(result, fields)),
+                        inflight=args.inflight,
+                        queue_size=args.queue_size,
+                        size=buffered_size,
+                        max_buffered=ASYNC_MAX_BUFFERED,
+                    )
+                )
+                return
+            if args.profile:
+                run_profiled(files, args, fields, budget, writer)
+                return
+            if args.watch:
+                run_watch(args, fields, budget, cache, writer)
+                return
+            if args.connect:
+                run_client(files, args, writer)
+                return
+            for result in process_files(
+                files,
+                args.jobs,
+                ordered=not args.unordered,
+                cache=cache,
+                fields=fields,
+                budget=budget,
+                worker=worker,
+            ):
+                writer.write(*project_result(result, fields))
+    finally:
+        if cache is not None:
+            cache.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,30 @@
+# Noms des codes des en-tetes BMP (BITMAPINFOHEADER a BITMAPV5HEADER).
+# Utilises par utils/printer.py pour la sortie texte : ce module ne contient
+# que des tables, l'imprimante n'importe pas le lecteur BMP.
+
+COMPRESSIONS = {
+    0: "BI_RGB (no compression)",
+    1: "BI_RLE8 (RLE 8-bit/pixel)",
+    2: "BI_RLE4 (RLE 4-bit/pixel)",
+    3: "BI_BITFIELDS (bit field or Huffman 1D compression)",
+    4: "BI_JPEG (JPEG image for printing devices)",
+    5: "BI_PNG (PNG image for printing devices)",
+    6: "BI_ALPHABITFIELDS (RGBA bit field masks)",
+    11: "BI_CMYK (no compression)",
+    12: "BI_CMYKRLE8 (RLE-8 compression)",
+    13: "BI_CMYKRLE4 (RLE-4 compression)",
+}
+
+COLOR_SPACES = {
+    0x73524742: "sRGB",
+    0x57696E20: "Windows Color Space",
+    0x4C494E4B: "Linked Color Profile",
+    0x4D424544: "MBED Color Profile",
+}
+
+RENDERING_INTENTS = {
+    0: "LCS_GM_ABS_COLORIMETRIC",
+    1: "LCS_GM_BUSINESS",
+    2: "LCS_GM_GRAPHICS",
+    4: "LCS_GM_IMAGES",
+}
@@ -1,69 +1,275 @@
-class GifImage:
-    def __init__(self, image_delay: int, transparent_color_index: int):
-        self.image_delay = image_delay
-        self.transparent_color_index = transparent_color_index
-
-
-class AppExtension:
-    def __init__(self, app_identifier: bytes, app_data: bytes):
-        self.app_identifier = app_identifier
-        self.app_data: bytearray = app_data
-        self.loop_count: int = 0
-
-
-class CommentExtension:
-    def __init__(self, comment_data: str):
-        self.comment_data = comment_data
+from array import array
+
+from utils.budget import ABORTED_KEY, BudgetedSource, BudgetExceeded
+from utils.source import STREAM_BUFFER_SIZE, FileSource, StreamWindow, as_source
+
+# Disposal Method du Graphic Control Extension (bits 2-4 du champ packed)
+DISPOSAL_METHODS = {
+    0: "Unspecified",
+    1: "Do not dispose",
+    2: "Restore to background",
+    3: "Restore to previous",
+}
+
+# Application Extensions portant le nombre de boucles de l'animation
+LOOP_EXTENSIONS = (b"NETSCAPE2.0", b"ANIMEXTS1.0")
+# Sous-blocs parcourus entre deux verifications du budget (une chaine de
+# sous-blocs d'un octet peut couvrir tout le fichier)
+BUDGET_CHECK_INTERVAL = 4096
+# Texte garde par Comment / Plain Text Extension, le reste de la chaine de
+# sous-blocs est saute sans etre copie
+MAX_TEXT_SIZE = 64 * 1024
+
+
+class GifFrameIndex:
+    """
+    Compact index of the frames (Image Descriptors) of a GIF.
+
+    One entry per frame, stored in typed arrays instead of one Python
+    object per frame:
+            descriptor_offsets: offset of the 0x2C Image Descriptor.
+            data_offsets: offset of the first LZW data sub-block.
+            data_lengths: size in bytes of the sub-block chain (length
+                    bytes included, block terminator excluded).
+            sub_block_counts: number of data sub-blocks.
+    """
+
+    def __init__(self):
+        self.descriptor_offsets = array("Q")
+        self.data_offsets = array("Q")
+        self.data_lengths = array("Q")
+        self.sub_block_counts = array("I")
+
+    def add(self, descriptor_offset, data_offset, data_length, sub_blocks):
+        self.descriptor_offsets.append(descriptor_offset)
+        self.data_offsets.append(data_offset)
+        self.data_lengths.append(data_length)
+        self.sub_block_counts.append(sub_blocks)
+
+    def __len__(self):
+        return len(self.descriptor_offsets)
+
+
+class GifTimeline:
+    """
+    Animation timeline of a GIF, aligned with GifFrameIndex.
+
+    One entry per frame, taken from the Graphic Control Extension that
+    precedes it (zeros for a frame without one), in typed arrays:
+            delays: display time in hundredths of a second.
+            disposals: disposal method (see DISPOSAL_METHODS).
+            transparency: 1 if the frame has a transparent color.
+            transparent_indices: palette index of the transparent color.
+
+    Totals are computed on the arrays, no per-frame object is built.
+    """
+
+    def __init__(self):
+        self.delays = array("H")
+        self.disposals = array("B")
+        self.transparency = array("B")
+        self.transparent_indices = array("B")
+
+    def add(self, delay, disposal, transparent, transparent_index):
+        self.delays.append(delay)
+        self.disposals.append(disposal)
+        self.transparency.append(transparent)
+        self.transparent_indices.append(transparent_index)
+
+    def __len__(self):
+        return len(self.delays)
+
+    def duration_ms(self) -> int:
+        """Total duration of one loop of the animation, in milliseconds."""
+        return sum(self.delays) * 10
+
+    def fps(self):
+        """Average frames per second over one loop, None without delays."""
+        duration = self.duration_ms()
+        if not duration:
+            return None
+        return round(len(self) * 1000 / duration, 2)
+
+    def disposal_counts(self) -> dict:
+        """Number of frames per disposal method (only the methods used)."""
+        counts = {}
+        for method in range(8):
+            count = self.disposals.count(method)
+            if count:
+                counts[DISPOSAL_METHODS.get(method, f"Reserved ({method})")] = count
+        return counts
 
 
 class GifReader:
-    def __init__(self, data: bytes, filename: str):
-        self.data: bytes = data
+    def __init__(
+        self,
+        data,
+        filename: str,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+        fields=None,
+    ):
+        # Le parcours des blocs GIF est sequentiel : on garde une vue sur
+        # tout le contenu (memoryview sans copie pour un fichier mappe).
+        # Sur un fichier ouvert (FileSource), la lecture passe par un tampon
+        # de taille fixe : la memoire reste constante quelle que soit la
+        # taille de l'animation, et les donnees d'image sont sautees par seek.
+        source = as_source(data, filename)
+        # Avec un budget (utils/budget.py), le parcours indexe directement
+        # le contenu : les octets parcourus sont comptes bloc par bloc.
+        self.budget = None
+        self._charged = 0  # Octets deja comptes dans le budget
+        if isinstance(source, BudgetedSource):
+            self.budget = source.budget
+            source = source.source
+        if isinstance(source, FileSource):
+            self.data = StreamWindow(source.file, source.size, buffer_size)
+        else:
+            self.data = source.read(0, source.size)
         self.offset: int = 0
         self.infos = dict()
+        self.frames = GifFrameIndex()
+        self.timeline = GifTimeline()
+        # Graphic Control Extension en attente de la prochaine image :
+        # (delai, disposal, transparence, index transparent)
+        self.graphic_control = None
+        # Champs demandes (utils/fields.py) : si l'en-tete suffit, les
+        # blocs ne sont pas parcourus.
+        self.fields = fields
 
     def extract(self):
-        while self.data[self.offset] != 0x3B:  # 0x3B is the GIF file terminator
-            byte = self.data[self.offset]
-            match byte:
-                case 0x2C:  # Image Descriptor
-                    self.skip_image()
-                    continue
-                case 0x21:  # Extension Introducer
-                    self.handle_extension()
-                case _:
-                    self.offset += 1
-                    # Move to the next byte
+        """
+        Walks the blocks following the header, up to the trailer (0x3B).
 
-    def read_comment_extension(self):
-        self.offset += 2  # Skip the label byte
+        Every block is skipped using its length fields, so the walk is a
+        single pass that never scans byte by byte. It stops on the trailer,
+        on an unknown block, at the end of the data (truncated file), or
+        when the budget is exceeded ("Aborted", the metadata found so far
+        is kept).
+        """
+        try:
+            while True:
+                if self.budget is not None:
+                    self._charge(self.offset)
+                byte = self.data[self.offset]
+                match byte:
+                    case 0x3B:  # Trailer : fin du fichier GIF
+                        break
+                    case 0x2C:  # Image Descriptor
+                        self.skip_image()
+                    case 0x21:  # Extension Introducer
+                        self.handle_extension()
+                    case _:
+                        self.infos["Parse Error"] = (
+                            f"Unknown block 0x{byte:02X} at offset {self.offset}"
+                        )
+                        break
+        except IndexError:
+            self.infos["Truncated"] = True
+        except BudgetExceeded as e:
+            self.infos[ABORTED_KEY] = e.as_dict()
+        self.infos["Frame Count"] = len(self.frames)
+        if len(self.frames) > 1:  # Animation
+            timeline = self.timeline
+            self.infos["Duration (ms)"] = timeline.duration_ms()
+            self.infos["FPS"] = timeline.fps()
+            self.infos["Transparent Frames"] = timeline.transparency.count(1)
+            self.infos["Disposal Methods"] = timeline.disposal_counts()
+
+    def _charge(self, offset: int):
+        # Compte dans le budget les octets parcourus jusqu'a `offset`
+        self.budget.charge(offset - self._charged)
+        self._charged = offset
+
+    def skip_sub_blocks(self) -> int:
+        """
+        Skips a chain of data sub-blocks starting at self.offset.
+
+        Returns:
+                int: Number of sub-blocks (the terminator is consumed).
 
-        while self.data[self.offset] != 0:
-            block_size = self.data[self.offset]
+        Raises:
+                IndexError: If the data ends before the block terminator.
+                BudgetExceeded: If the budget is exceeded within the chain.
+        """
+        data = self.data
+        offset = self.offset
+        count = 0
+        check = self.budget is not None
+        block_size = data[offset]
+        while block_size:
+            offset += block_size + 1
+            count += 1
+            if check and not count % BUDGET_CHECK_INTERVAL:
+                self._charge(offset)
+            block_size = data[offset]
+        self.offset = offset + 1
+        return count
+
+    def read_sub_blocks(self, max_size: int = MAX_TEXT_SIZE) -> tuple:
+        """
+        Reads a chain of data sub-blocks starting at self.offset.
+
+        Only the first `max_size` bytes of content are copied, the rest of
+        the chain is skipped (see skip_sub_blocks()).
+
+        Returns:
+                tuple: (content, length). `content` is a bytearray of at most
+                        `max_size` bytes, `length` the size of the whole
+                        content.
+        """
+        data = self.data
+        start = self.offset
+        content = bytearray()
+        count = 0
+        check = self.budget is not None
+        block_size = data[self.offset]
+        while block_size and len(content) < max_size:
             self.offset += 1
-            comment_data = self.data[self.offset : self.offset + block_size]
-            comment_text = comment_data.decode("ascii", errors="ignore")
-            self.infos.setdefault("Comment Extensions", []).append(comment_text)
-            self.offset += block_size  # Move to the next sub-block
+            end = self.offset + min(block_size, max_size - len(content))
+            content += data[self.offset : end]
+            self.offset += block_size
+            count += 1
+            if check and not count % BUDGET_CHECK_INTERVAL:
+                self._charge(self.offset)
+            block_size = data[self.offset]
+        if block_size:
+            count += self.skip_sub_blocks()
+        else:
+            self.offset += 1  # Skip the block terminator
+        # Octets de la chaine, moins un octet de longueur par sous-bloc
+        return content, self.offset - 1 - start - count
+
+    def read_text(self) -> str:
+        # Contenu texte d'une Comment / Plain Text Extension
+        content, length = self.read_sub_blocks()
+        text = str(content, "ascii", errors="ignore")
+        if length > len(content):
+            text += f"... <truncated, {length} bytes>"
+        return text
 
-        self.offset += 1  # Skip the block terminator
+    def read_comment_extension(self):
+        self.offset += 2  # Skip the introducer and label bytes
+        comment_text = self.read_text()
+        self.infos.setdefault("Comment Extensions", []).append(comment_text)
 
     def handle_extension(self):
         label = self.data[self.offset + 1]
 
         match label:
             case 0xF9:  # Graphic Control Extension (GIF89a)
-                self.offset += 3
-                delay = self.data[self.offset + 1] + (self.data[self.offset + 2] << 8)
-                transparent_index = self.data[self.offset + 3]
-                self.offset += 5
-                self.infos.setdefault("Images", []).append(
-                    {"delay": delay, "transparent_index": transparent_index}
+                # 21 F9 04 <packed> <delay 2 octets> <transparent index> 00
+                data = self.data
+                packed = data[self.offset + 3]
+                self.graphic_control = (
+                    data[self.offset + 4] + (data[self.offset + 5] << 8),
+                    (packed >> 2) & 0b111,
+                    packed & 0b1,
+                    data[self.offset + 6],
                 )
-                return
+                self.offset += 2 + 1 + data[self.offset + 2]
+                self.skip_sub_blocks()
             case 0xFE:
                 self.read_comment_extension()
-                return
             case 0xFF:
                 self.offset += 2
                 block_size = self.data[
@@ -71,81 +277,60 @@ class GifReader:
                 ]  # La taille du bloc est variable ici
                 self.offset += 1
                 app_identifier = self.data[self.offset : self.offset + block_size]
-                application = app_identifier.decode("ascii", errors="ignore")
+                application = str(app_identifier, "ascii", errors="ignore")
                 self.offset += block_size
 
-                app_data = bytearray()
-                while self.data[self.offset] != 0:
-                    size = self.data[self.offset]
-                    self.offset += 1
-                    app_data += self.data[self.offset : self.offset + size]
-                    self.offset += size
-                self.offset += 1
+                # Seul le premier sous-bloc est lu (nombre de boucles), les
+                # donnees (ex: XMP, profil ICC) ne sont que sautees
+                first_block, length = self.read_sub_blocks(max_size=3)
                 self.infos.setdefault("App Extensions", []).append(
-                    {"application": application, "data length": len(app_data)}
+                    {"application": application, "data length": length}
                 )
-                return
+                # Sous-bloc 1 : nombre de boucles sur 2 octets (0 = infini)
+                if (
+                    app_identifier in LOOP_EXTENSIONS
+                    and len(first_block) >= 3
+                    and first_block[0] == 1
+                ):
+                    self.infos["Loop Count"] = first_block[1] | (first_block[2] << 8)
             case 0x01:  # Plain Text Extension (GIF89a)
                 self.offset += 2
                 block_size = self.data[self.offset]
                 self.offset += 1 + block_size
-                text_data = ""
-                while self.data[self.offset] != 0:
-                    sub_block_size = self.data[self.offset]
-                    self.offset += 1
-                    text_data += self.data[
-                        self.offset : self.offset + sub_block_size
-                    ].decode("ascii", errors="ignore")
-                    self.offset += sub_block_size
-
+                text_data = self.read_text()
                 self.infos.setdefault("Plain Text Extensions", []).append(text_data)
-                self.offset += 1
-                return
+                # Le Graphic Control Extension precedent portait sur ce texte
+                self.graphic_control = None
             case _:
                 self.offset += 2
-                while self.data[self.offset] != 0:
-                    block_size = self.data[self.offset]
-                    self.offset += 1 + block_size
-                self.offset += 1
-                return self.offset
+                self.skip_sub_blocks()
 
     def skip_image(self):
-        if self.offset + 9 >= len(self.data):
-            return len(self.data)
-
+        # Image Descriptor : 2C, left, top, width, height (2 octets chacun), packed
+        descriptor_offset = self.offset
         packed = self.data[self.offset + 9]
         local_color_table_flag = (packed & 0b10000000) >> 7
         size_of_lct = packed & 0b00000111
 
-        if local_color_table_flag:
-            entries = 2 ** (size_of_lct + 1)
-            table_size = 3 * entries
-            if self.offset + 10 + table_size >= len(self.data):
-                return len(self.data)
-            self.offset += table_size  # Each color is 3 bytes (RGB)
-
         self.offset += 10
-        if self.offset >= len(self.data):
-            return len(self.data)
+        if local_color_table_flag:
+            # Each color is 3 bytes (RGB)
+            self.offset += 3 * 2 ** (size_of_lct + 1)
 
         self.offset += 1  # LZW Minimum Code Size
-        if self.offset >= len(self.data):
-            return len(self.data)
-
-        while self.data[self.offset] != 0:  # Data Sub-blocks
-            block_size = self.data[self.offset]
-            if block_size == 0:
-                self.offset += 1
-                break
-            self.offset += block_size + 1  # Move to the next sub-block
-
-        self.offset += 1  # Skip the block terminator
+        data_offset = self.offset
+        sub_blocks = self.skip_sub_blocks()
+        self.frames.add(
+            descriptor_offset, data_offset, self.offset - 1 - data_offset, sub_blocks
+        )
+        self.timeline.add(*(self.graphic_control or (0, 0, 0, 0)))
+        self.graphic_control = None
 
     def extract_header(self):
         # GIF89a (norme de 1989) or GIF87a (norme de 1987)
         header = self.data[:6]
-        version = header[3:].decode("ascii")
-        signature = header[:3].decode("ascii")
+        version = str(header[3:], "ascii")
+        signature = str(header[:3], "ascii")
         self.infos["Signature"] = signature
         self.infos["Version"] = version
 
@@ -156,6 +341,8 @@ class GifReader:
         # 11   : Background Color Index (1 byte)
         # 12   : Pixel Aspect Ratio (1 byte)
         lsd = self.data[6:13]
+        if len(lsd) < 7:
+            raise ValueError("GIF Logical Screen Descriptor too short")
         self.infos["Width"] = int.from_bytes(lsd[0:2], "little")
         self.infos["Height"] = int.from_bytes(lsd[2:4], "little")
         self.infos["Global Color Table Flag"] = (lsd[4] & 0b10000000) >> 7
@@ -176,6 +363,12 @@ class GifReader:
         # Background Color Index : 1 byte (index in the global color table)
         # Couleur de fond de l'image
         self.infos["Background Color Index"] = lsd[5]
+
+        # Les blocs commencent apres l'en-tete (13 octets) et la table de
+        # couleurs globale eventuelle.
+        self.offset = 13
+        if self.infos["Global Color Table Flag"]:
+            self.offset += 3 * self.infos["Size of Global Color Table"]
         return
 
     def run(self):
@@ -208,38 +401,32 @@ class GifReader:
             Taille de la table de couleurs globale (nombre d'entrées).
         background_color_index : int
             Index de la couleur de fond dans la table de couleurs globale.
-        images : list of GifImage
-            Liste des images extraites du GIF.
-
-            Chaque GifImage contient :
-
-            - image_delay : int
-                Délai d'affichage en centièmes de seconde (0.01s par unité).
-            - transparent_color_index : int
-                Index de la couleur transparente dans la palette (0-255).
-
-        app_extensions : list of AppExtension
-            Application Extensions détectées dans le fichier.
-
-            Chaque AppExtension contient :
-
-            - app_identifier : bytes
-                Identifiant de l'application sur 11 bytes.
-                Format : 8 bytes nom + 3 bytes version.
-                Exemple : b'NETSCAPE2.0'
-            - app_data : bytearray
-                Données binaires spécifiques à l'application.
-            - loop_count : int, optional
-                Nombre de boucles d'animation (0 = infini).
-                Présent uniquement pour NETSCAPE2.0 et ANIMEXTS1.0.
-
-        comment_extensions : list of CommentExtension
-            Commentaires texte extraits du GIF.
-
-            Chaque CommentExtension contient :
-
-            comment_data : str
-                Texte du commentaire en ASCII.
+        frames : GifFrameIndex
+            Position des images (Image Descriptors) et de leurs données LZW.
+        timeline : GifTimeline
+            Délai (centièmes de seconde), disposal method, transparence et
+            index transparent de chaque image, dans des arrays typés.
+            Les totaux sont ajoutés aux métadonnées : "Duration (ms)",
+            "FPS", "Transparent Frames", "Disposal Methods".
+
+        app_extensions : list of dict
+            Application Extensions détectées dans le fichier
+            ("application" : identifiant sur 11 bytes, ex. "NETSCAPE2.0",
+            "data length" : taille des données).
+        loop_count : int
+            Nombre de boucles de l'animation (0 = infini), clé "Loop Count".
+            Présent uniquement avec un bloc NETSCAPE2.0 ou ANIMEXTS1.0.
+        comment_extensions : list of str
+            Commentaires texte extraits du GIF (au plus MAX_TEXT_SIZE
+            octets chacun, comme les Plain Text Extensions).
         """
         self.extract_header()
-        self.extract()
+        if self.fields is None or not self.fields.satisfied(self.infos):
+            self.extract()
+
+
+def extract(source, filename: str, fields=None) -> dict:
+    """Entry point of the reader registry (see metadata_readers/registry.py)."""
+    extractor = GifReader(source, filename, fields=fields)
+    extractor.run()
+    return extractor.infos
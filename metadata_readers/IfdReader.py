@@ -0,0 +1,290 @@
+import struct
+
+from metadata_readers.ExifTags import CHARSET_TAGS, IFD_POINTERS, MAKERNOTE, TAGS
+from utils.source import as_source
+
+EXIF_HEADER = b"Exif\x00\x00"
+
+# Type TIFF -> (format struct d'une valeur, taille d'une valeur en octets)
+TIFF_TYPES = {
+    1: ("B", 1),  # BYTE
+    2: ("s", 1),  # ASCII
+    3: ("H", 2),  # SHORT
+    4: ("I", 4),  # LONG
+    5: ("II", 8),  # RATIONAL
+    6: ("b", 1),  # SBYTE
+    7: ("s", 1),  # UNDEFINED
+    8: ("h", 2),  # SSHORT
+    9: ("i", 4),  # SLONG
+    10: ("ii", 8),  # SRATIONAL
+    11: ("f", 4),  # FLOAT
+    12: ("d", 8),  # DOUBLE
+    13: ("I", 4),  # IFD
+}
+
+
+def decode_bytes(value: bytes) -> str:
+    # Les 8 premiers octets donnent le jeu de caracteres (UserComment, ...)
+    charset = value[:8]
+    text = value[8:]
+
+    if b"ASCII" in charset:
+        return text.decode("ascii", errors="ignore")
+    elif b"JIS" in charset:
+        return text.decode("shift_jis", errors="ignore")
+    elif b"Unicode" in charset:
+        return text.decode("utf-16", errors="ignore")
+    else:
+        return text.decode("utf-8", errors="ignore")
+
+
+def read_value(buf, endian: str, tag: int, typ: int, count: int, offset: int = 0):
+    """
+    Decodes the value of an IFD entry from `buf`.
+
+    ASCII values are cut at the first NUL, UNDEFINED values become text
+    when printable (hex otherwise), charset-prefixed tags go through
+    decode_bytes(), rationals become (numerator, denominator) tuples.
+    A single value is returned as a scalar, several as a tuple.
+
+    Raises:
+        ValueError: `count` values of type `typ` do not fit in `buf` after
+                `offset`.
+    """
+    fmt, size = TIFF_TYPES[typ]
+    # Le compte vient du fichier : verifie avant de construire quoi que ce soit
+    if count < 0 or count * size > len(buf) - offset:
+        raise ValueError(f"{count} values of type {typ} overflow the buffer")
+    if typ == 2:  # ASCII, termine par un NUL
+        raw = bytes(buf[offset : offset + count])
+        return raw.split(b"\x00", 1)[0].decode("utf-8", errors="ignore")
+    # UNDEFINED (certains encodeurs ecrivent ces tags en BYTE)
+    if typ == 7 or (typ == 1 and (tag in CHARSET_TAGS or tag == MAKERNOTE)):
+        raw = bytes(buf[offset : offset + count])
+        if tag == MAKERNOTE:
+            return raw
+        if tag in CHARSET_TAGS:
+            return decode_bytes(raw)
+        if raw.isascii() and raw.decode("ascii").isprintable():
+            return raw.decode("ascii")
+        return raw.hex()
+
+    # Format compte ("<1000I") : sa longueur ne depend pas du compte
+    values = struct.unpack_from(f"{endian}{count * len(fmt)}{fmt[0]}", buf, offset)
+    if typ in (5, 10):  # RATIONAL : (numerateur, denominateur)
+        values = tuple(zip(values[::2], values[1::2]))
+    return values[0] if count == 1 else values
+
+
+class Ifd:
+    """
+    One IFD (Image File Directory) of a TIFF structure.
+
+    The entry table is read when the IFD is created (12 bytes per entry);
+    a value is read and decoded only the first time it is accessed, then
+    kept. Sub-IFDs (Exif, GPSInfo, Interop) are only parsed through
+    sub_ifd().
+
+    Attributes:
+            offset (int): Offset of the IFD in the TIFF structure.
+            names (dict): Tag number -> tag name for this IFD.
+            next_offset (int): Offset of the next IFD (0 if none).
+    """
+
+    __slots__ = ("reader", "offset", "names", "next_offset", "_entries", "_values")
+
+    def __init__(self, reader, offset: int, names: dict):
+        self.reader = reader
+        self.offset = offset
+        self.names = names
+        self._values = {}
+        # tag -> (type, nombre de valeurs, position des valeurs)
+        self._entries = {}
+
+        endian = reader.endian
+        count = struct.unpack_from(endian + "H", reader.read(offset, 2))[0]
+        table = reader.read(offset + 2, 12 * count + 4)
+        for entry in range(0, min(12 * count, len(table) - 11), 12):
+            tag, typ, value_count = struct.unpack_from(endian + "HHI", table, entry)
+            if typ not in TIFF_TYPES:
+                continue
+            if TIFF_TYPES[typ][1] * value_count <= 4:
+                position = offset + 2 + entry + 8
+            else:
+                position = struct.unpack_from(endian + "I", table, entry + 8)[0]
+            self._entries[tag] = (typ, value_count, position)
+
+        if len(table) >= 12 * count + 4:
+            self.next_offset = struct.unpack_from(endian + "I", table, 12 * count)[0]
+        else:
+            self.next_offset = 0
+
+    def __contains__(self, tag: int) -> bool:
+        return tag in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def tags(self):
+        """Returns the tag numbers of the entries, in file order."""
+        return self._entries.keys()
+
+    def get(self, tag: int, default=None):
+        """
+        Returns the decoded value of `tag`, or `default` if the entry is
+        missing or its value lies outside of the TIFF structure.
+
+        MakerNote is returned as "<N bytes>" without being read, unless the
+        reader was created with makernote=True (raw bytes are returned).
+        """
+        if tag in self._values:
+            return self._values[tag]
+        if tag not in self._entries:
+            return default
+
+        typ, count, position = self._entries[tag]
+        size = TIFF_TYPES[typ][1] * count
+        if position + size > self.reader.size:
+            return default
+        if tag == MAKERNOTE and not self.reader.makernote:
+            value = f"<{size} bytes>"
+        else:
+            buf = self.reader.read(position, size)
+            value = read_value(buf, self.reader.endian, tag, typ, count)
+        self._values[tag] = value
+        return value
+
+    def sub_ifd(self, tag: int):
+        """Returns the sub-IFD a pointer tag (see IFD_POINTERS) points to, or None."""
+        offset = self.get(tag)
+        if not isinstance(offset, int):
+            return None
+        names = IFD_POINTERS[tag][1] if tag in IFD_POINTERS else TAGS
+        return self.reader.ifd(offset, names)
+
+    def to_dict(self, name: str, metadata: dict, visited: set, fields=None):
+        """
+        Decodes every value of the IFD into metadata[name] (tag name -> value),
+        and the sub-IFDs it points to into their own keys of `metadata`.
+
+        With `fields` (utils/fields.py), only the requested tags are decoded,
+        unless the IFD itself is requested (e.g. "GPSInfo").
+        """
+        visited.add(self.offset)
+        ifd = metadata.setdefault(name, {})
+        decode_all = fields is None or fields.wants(name)
+        for tag in self._entries:
+            if tag in IFD_POINTERS:
+                sub = self.sub_ifd(tag)
+                if sub is not None and sub.offset not in visited:
+                    sub_name = IFD_POINTERS[tag][0]
+                    sub.to_dict(
+                        sub_name, metadata, visited, None if decode_all else fields
+                    )
+                continue
+            tag_name = self.names.get(tag, tag)
+            if not decode_all and not fields.wants(tag_name):
+                continue
+            value = self.get(tag, self)
+            if value is not self:
+                ifd[tag_name] = value
+
+
+class IfdReader:
+    """
+    Lazy decoder of a TIFF structure: EXIF payload of a JPEG APP1 segment,
+    PNG eXIf / WebP EXIF chunk, or a whole TIFF file.
+
+    Only the 8-byte TIFF header is read on creation. IFD entry tables are
+    read when an IFD is requested, values when they are accessed; offsets
+    are checked against the size of the structure, and an IFD referenced
+    twice is decoded once by to_dict().
+
+    Usage:
+            exif = IfdReader(payload)
+            date = exif.ifd0.sub_ifd(0x8769).get(0x9003)  # DateTimeOriginal
+            metadata = exif.to_dict()
+
+    Args:
+            data (bytes|memoryview|ByteSource): Buffer or source holding the
+                    structure.
+            offset (int): Position of the TIFF header in `data`. A leading
+                    "Exif\\0\\0" header at this position is skipped.
+            makernote (bool): Read the MakerNote blob (raw bytes) instead of
+                    reporting its size only.
+
+    Raises:
+            ValueError: If there is no valid TIFF header at `offset`.
+    """
+
+    def __init__(self, data, offset: int = 0, makernote: bool = False):
+        self.source = as_source(data)
+        self.makernote = makernote
+        if bytes(self.source.read(offset, 6)) == EXIF_HEADER:
+            offset += 6
+        self.base = offset
+        self.size = self.source.size - offset
+
+        header = bytes(self.source.read(offset, 8))
+        if len(header) < 8:
+            raise ValueError("TIFF header too short")
+        if header[:2] == b"II":
+            self.endian = "<"
+        elif header[:2] == b"MM":
+            self.endian = ">"
+        else:
+            raise ValueError("Invalid TIFF byte order")
+        magic, self.ifd0_offset = struct.unpack_from(self.endian + "HI", header, 2)
+        if magic != 42:
+            raise ValueError("Invalid TIFF magic number")
+
+    def read(self, offset: int, size: int):
+        """Reads `size` bytes at `offset` from the start of the TIFF header."""
+        return self.source.read(self.base + offset, size)
+
+    def ifd(self, offset: int, names: dict = TAGS):
+        """Returns the IFD at `offset`, or None if it lies outside of the structure."""
+        if offset + 2 > self.size:
+            return None
+        return Ifd(self, offset, names)
+
+    @property
+    def ifd0(self):
+        """
+        First IFD ("0th"), or None if its offset is invalid.
+
+        Not kept by the reader, like the sub-IFDs: an Ifd references its
+        reader, and a cycle would keep the buffer of the file alive until
+        the next garbage collection.
+        """
+        return self.ifd(self.ifd0_offset)
+
+    def to_dict(self, fields=None) -> dict:
+        """
+        Decodes the whole structure (only the requested tags with `fields`,
+        see Ifd.to_dict()).
+
+        Returns:
+                dict: { ifd_name: { tag_name: value } } with ifd_name in
+                        "0th", "Exif", "GPSInfo", "Interop". Rationals are
+                        (numerator, denominator) tuples.
+        """
+        metadata = {}
+        ifd0 = self.ifd0
+        if ifd0 is not None:
+            ifd0.to_dict("0th", metadata, set(), fields)
+        return metadata
+
+
+def decode_exif(data, fields=None, offset: int = 0) -> dict:
+    """
+    Decodes a whole EXIF / TIFF structure with IfdReader.to_dict(fields).
+
+    Returns:
+            dict: { ifd_name: { tag_name: value } }, empty if there is no
+                    valid TIFF header at `offset`.
+    """
+    try:
+        return IfdReader(data, offset).to_dict(fields)
+    except ValueError:
+        return {}
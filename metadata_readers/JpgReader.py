@@ -1,9 +1,42 @@
-from PIL import Image, ExifTags
+from metadata_readers.IfdReader import EXIF_HEADER, decode_bytes, decode_exif
+from utils.source import FileSource, as_source
+
+# Marqueurs JPEG sans champ longueur : TEM et RST0..RST7
+STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+SOS = 0xDA  # Start Of Scan : les donnees compressees commencent
+EOI = 0xD9  # End Of Image
+APP1 = 0xE1
+# Start Of Frame : SOF0..SOF15 sauf DHT (C4), JPG (C8) et DAC (CC)
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+SIZE_KEY = "Size (width, height)"
+# Octets lus a la fois pour sauter une suite d'octets de remplissage (FF)
+FILL_SCAN_SIZE = 4096
 
 
 class JPGParser:
-    def __init__(self, path):
+    """
+    Reads the dimensions and EXIF metadata of a JPEG file without decoding
+    the image.
+
+    The file is walked marker by marker using the segment lengths, up to
+    the first SOS marker (start of the compressed data). The SOF segment
+    gives the dimensions, the APP1 "Exif" segment holds a TIFF structure,
+    decoded by IfdReader. With `fields`, the walk stops as soon as the
+    requested parts are found (e.g. at the SOF header for "dimensions").
+
+    Args:
+            path (str): Path to the JPEG file.
+            source (ByteSource|None): Already opened source over the file,
+                    avoids opening it again.
+            fields (FieldSelection|None): Requested fields (utils/fields.py),
+                    None for everything.
+    """
+
+    def __init__(self, path, source=None, fields=None):
         self.path = path
+        # Source deja ouverte (ByteSource), evite de rouvrir le fichier.
+        self.source = source
+        self.fields = fields
 
     def run(self):
         """
@@ -16,9 +49,10 @@ class JPGParser:
 
             Example:
             {
+                'Size (width, height)': (4000, 3000),
                 '0th': {
-                    'ImageWidth': 1024,
-                    'ImageLength': 768,
+                    'Make': 'Canon',
+                    'XResolution': (72, 1),
                     ...
                 },
                 'Exif': {
@@ -26,7 +60,7 @@ class JPGParser:
                     'FNumber': (28, 10),
                     ...
                 },
-                'GPS': {
+                'GPSInfo': {
                     'GPSLatitudeRef': 'N',
                     'GPSLatitude': ((34, 1), (3, 1), (30, 1)),
                     ...
@@ -34,48 +68,118 @@ class JPGParser:
                 ...
             }
         """
-        return self.extract_exif(self.path)
+        if self.source is None:
+            with open(self.path, "rb") as f:
+                return self._extract_infos(FileSource(f, self.path))
+        return self._extract_infos(self.source)
+
+    def _extract_infos(self, source) -> dict:
+        fields = self.fields
+        need_size = fields is None or fields.wants(SIZE_KEY)
+        need_exif = fields is None or fields.wants_other_than(SIZE_KEY)
+
+        size = None
+        exif = {}
+        for marker, pos, length in self.iter_segments(source):
+            if marker in SOF_MARKERS and need_size and length >= 7:
+                # Precision (1 octet), hauteur, largeur (2 octets chacune)
+                header = source.read(pos + 5, 4)
+                height = int.from_bytes(header[0:2], "big")
+                width = int.from_bytes(header[2:4], "big")
+                size = (width, height)
+                need_size = False
+            elif marker == APP1 and need_exif and length >= 8:
+                if bytes(source.read(pos + 4, 6)) == EXIF_HEADER:
+                    exif = decode_exif(source.read(pos + 10, length - 8), fields)
+                    need_exif = False
+            if not need_size and not need_exif:
+                break
+
+        if size is None:
+            return exif
+        return {SIZE_KEY: size, **exif}
+
+    # Conserve pour compatibilite, voir metadata_readers/IfdReader.py
+    decode_bytes = staticmethod(decode_bytes)
+
+    @staticmethod
+    def find_exif_segment(source):
+        """
+        Walks the JPEG markers and returns the TIFF payload of the APP1 Exif segment.
+
+        Segments are walked with iter_segments(), without reading their content.
+
+        Args:
+                source (ByteSource): Source over the JPEG file.
+
+        Returns:
+                bytes|memoryview|None: TIFF structure (after "Exif\\0\\0"),
+                        None if the file has no EXIF segment.
+        """
+        for marker, pos, length in JPGParser.iter_segments(source):
+            if marker == APP1 and length >= 8:
+                if bytes(source.read(pos + 4, 6)) == EXIF_HEADER:
+                    return source.read(pos + 10, length - 8)
+        return None
+
+    @staticmethod
+    def iter_segments(source):
+        """
+        Yields (marker, position, length) for each JPEG segment, up to SOS / EOI.
+
+        `position` is the offset of the FF byte of the marker, `length` the
+        2-byte big-endian segment length (which includes itself). Segment
+        contents are not read.
+        """
+        pos = 2  # SOI (FF D8)
+        while pos + 4 <= source.size:
+            marker_header = source.read(pos, 4)
+            if marker_header[0] != 0xFF:
+                return  # Flux corrompu : plus de marqueur
+            marker = marker_header[1]
+            if marker == 0xFF:  # Octets de remplissage, sautes en bloc
+                fill = bytes(source.read(pos + 1, FILL_SCAN_SIZE))
+                pos += len(fill) - len(fill.lstrip(b"\xff"))
+                continue
+            if marker in STANDALONE_MARKERS:
+                pos += 2
+                continue
+            if marker in (SOS, EOI):
+                return
+
+            length = int.from_bytes(marker_header[2:4], "big")
+            yield marker, pos, length
+            pos += 2 + length
 
     @staticmethod
-    def decode_bytes(value: bytes) -> str:
-        charset = value[:8]
-        text = value[8:]
-
-        if b"ASCII" in charset:
-            return text.decode("ascii", errors="ignore")
-        elif b"JIS" in charset:
-            return text.decode("shift_jis", errors="ignore")
-        elif b"Unicode" in charset:
-            return text.decode("utf-16", errors="ignore")
-        else:
-            return text.decode("utf-8", errors="ignore")
+    def decode_tiff(buf) -> dict:
+        """
+        Decodes the IFDs of a TIFF structure (EXIF payload).
+
+        Args:
+                buf (bytes|memoryview): TIFF header + IFDs. A leading
+                        "Exif\\0\\0" header is accepted.
+
+        Returns:
+                dict: { ifd_name: { tag_name: value } } with ifd_name in
+                        "0th", "Exif", "GPSInfo", "Interop", empty if `buf` is
+                        not a TIFF structure (see IfdReader.decode_exif()).
+        """
+        return decode_exif(buf)
 
     @staticmethod
-    def extract_exif(path: str) -> dict:
-        img = Image.open(path)
-        exif_data = img.getexif()
-
-        metadata = {}
-
-        IFD_CODE_LOOKUP = {i.value: i.name for i in ExifTags.IFD}
-
-        for tag, value in exif_data.items():
-            if tag in IFD_CODE_LOOKUP:
-                ifd_name = IFD_CODE_LOOKUP[tag]
-                ifd_data = exif_data.get_ifd(tag).items()
-                if ifd_name not in metadata:
-                    metadata[ifd_name] = {}
-                for sub_tag, sub_value in ifd_data:
-                    sub_tag_name = (
-                        ExifTags.TAGS.get(sub_tag, None)
-                        or ExifTags.GPSTAGS.get(sub_tag, None)
-                        or sub_tag
-                    )
-
-                    if isinstance(sub_value, bytes):
-                        try:
-                            sub_value = JPGParser.decode_bytes(sub_value)
-                        except UnicodeDecodeError:
-                            sub_value = sub_value.hex()
-                    metadata[ifd_name][sub_tag_name] = sub_value
-        return metadata
+    def extract_exif(path) -> dict:
+        # `path` peut etre un chemin, une source (ByteSource) ou le contenu du fichier.
+        if isinstance(path, str):
+            with open(path, "rb") as f:
+                return JPGParser.extract_exif(FileSource(f, path))
+
+        payload = JPGParser.find_exif_segment(as_source(path))
+        if payload is None:
+            return {}
+        return decode_exif(payload)
+
+
+def extract(source, filename: str, fields=None) -> dict:
+    """Entry point of the reader registry (see metadata_readers/registry.py)."""
+    return JPGParser(filename, source, fields).run()
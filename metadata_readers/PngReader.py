@@ -1,66 +1,367 @@
-from PIL import Image
-from io import BytesIO
 import argparse
+import os
+import struct
+import zlib
 
-from metadata_readers.JpgReader import JPGParser
+from metadata_readers.IfdReader import decode_exif
+from utils.source import as_source, open_source
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# (color type, bit depth) -> mode (memes noms que Pillow)
+COLOR_MODES = {
+    (0, 1): "1",
+    (0, 2): "L",
+    (0, 4): "L",
+    (0, 8): "L",
+    (0, 16): "I;16",
+    (2, 8): "RGB",
+    (2, 16): "RGB",
+    (3, 1): "P",
+    (3, 2): "P",
+    (3, 4): "P",
+    (3, 8): "P",
+    (4, 8): "LA",
+    (4, 16): "LA",
+    (6, 8): "RGBA",
+    (6, 16): "RGBA",
+}
+
+COLOR_TYPES = {
+    0: "Grayscale",
+    2: "Truecolor",
+    3: "Indexed-color",
+    4: "Grayscale with alpha",
+    6: "Truecolor with alpha",
+}
+
+# Taille maximale d'un texte zTXt / iTXt une fois decompresse
+# (protection contre les bombes de decompression).
+MAX_TEXT_SIZE = 1_000_000
+# Taille maximale de l'ensemble des textes decompresses d'un fichier
+MAX_TEXT_TOTAL = 4 * MAX_TEXT_SIZE
+
+# Octets lus pour trouver l'en-tete d'un chunk iTXt (mot-cle <= 79 octets,
+# langue et mot-cle traduit).
+TEXT_HEADER_SIZE = 512
+# En-tete d'un chunk zTXt : mot-cle (<= 79 octets), NUL, methode
+ZTXT_HEADER_SIZE = 81
+
+
+class TextAllowance:
+    """
+    Number of bytes the compressed texts of one file may still inflate to,
+    shared by its LazyText values.
+
+    Args:
+            remaining (int): Initial allowance (see PngReader._text_allowance()).
+    """
+
+    __slots__ = ("remaining",)
+
+    def __init__(self, remaining: int = MAX_TEXT_TOTAL):
+        self.remaining = remaining
+
+
+def _file_version(st) -> tuple:
+    return st.st_size, st.st_mtime_ns
+
+
+class LazyText:
+    """
+    Compressed PNG text value (zTXt or compressed iTXt), inflated on demand.
+
+    The chunk walk only records where the compressed bytes are; zlib runs
+    the first time the value is read (str(), .value, printing), and at most
+    MAX_TEXT_SIZE bytes are produced. The compressed bytes are read again
+    from the file then, unless it has changed since the analysis (size or
+    modification time): the value is then an error text, never the text of
+    another version of the file. All the texts of a file draw from the
+    same TextAllowance: once it is used up, the following values are not
+    inflated, so a file with hundreds of compressed chunks stays bounded.
+
+    Args:
+            source (ByteSource): Source the chunk was found in.
+            offset (int): Offset of the compressed data in the file.
+            length (int): Length of the compressed data.
+            encoding (str): "latin-1" (zTXt) or "utf-8" (iTXt).
+            allowance (TextAllowance|None): Allowance of the file (a new one
+                    of MAX_TEXT_TOTAL bytes if None).
+    """
+
+    __slots__ = (
+        "path",
+        "offset",
+        "length",
+        "encoding",
+        "allowance",
+        "version",
+        "_compressed",
+        "_value",
+    )
+
+    def __init__(self, source, offset: int, length: int, encoding: str, allowance=None):
+        self.path = source.path
+        self.offset = offset
+        self.length = length
+        self.encoding = encoding
+        self.allowance = allowance or TextAllowance()
+        self._value = None
+        # Sans chemin, la source ne pourra pas etre relue : on garde les
+        # octets compresses (jamais la version decompressee).
+        self._compressed = None if self.path else bytes(source.read(offset, length))
+        self.version = _file_version(os.stat(self.path)) if self.path else None
+
+    def _load_compressed(self) -> bytes | None:
+        # None si le fichier a change depuis l'analyse
+        if self._compressed is not None:
+            return self._compressed
+        with open(self.path, "rb") as f:
+            if _file_version(os.fstat(f.fileno())) != self.version:
+                return None
+            f.seek(self.offset)
+            return f.read(self.length)
+
+    @property
+    def value(self) -> str:
+        if self._value is None:
+            limit = min(MAX_TEXT_SIZE, self.allowance.remaining)
+            if limit <= 0:
+                self._value = "<not inflated: text size limit of the file reached>"
+                return self._value
+            inflater = zlib.decompressobj()
+            try:
+                compressed = self._load_compressed()
+                if compressed is None:
+                    self._value = "<not inflated: file changed since it was analysed>"
+                    return self._value
+                raw = inflater.decompress(compressed, limit)
+                self.allowance.remaining -= len(raw)
+                text = raw.decode(self.encoding, errors="replace")
+                if inflater.unconsumed_tail:
+                    text += f"... [truncated at {limit} bytes]"
+            except (zlib.error, OSError) as e:
+                text = f"<invalid compressed text: {e}>"
+            self._value = text
+        return self._value
+
+    def __str__(self):
+        return self.value
+
+    def __repr__(self):
+        if self._value is None:
+            return f"<LazyText {self.length} compressed bytes>"
+        return repr(self._value)
+
+
+SRGB_INTENTS = {
+    0: "Perceptual",
+    1: "Relative colorimetric",
+    2: "Saturation",
+    3: "Absolute colorimetric",
+}
 
 
 class PngReader:
     """
     PngReader is a class for reading and extracting metadata from PNG image files.
+
+    The file is walked chunk by chunk: each chunk header gives the length
+    of its data, so IDAT chunks (the compressed pixels) are skipped without
+    being read, and no pixel data is ever decoded.
+
     Attributes:
             path_file (str): Path to the PNG file.
-            data (bytes): Raw image data in bytes.
-            img (PIL.Image.Image): Opened image object.
+            source (ByteSource|None): Seekable source over the PNG content.
             img_info (dict): Dictionary containing extracted image information.
+            fields (FieldSelection|None): Requested fields; the walk stops
+                    once they are all found.
     Methods:
-            __init__(data=None, path_file=None):
+            __init__(data=None, path_file=None, fields=None):
                     Initializes the PngReader with image data or a file path.
-            _open_img():
-                    Opens the image from the provided data or path. Raises ValueError if the image is not a valid PNG.
+            _iter_chunks():
+                    Yields (type, data offset, length) for each chunk, up to IEND.
             _extract_infos():
-                    Extracts metadata and information from the opened image, including signature, format, size, byte size, mode, info, and EXIF data.
+                    Extracts signature, format, size, on-disk byte size, mode,
+                    IHDR fields, PLTE/tRNS/pHYs/gAMA/sRGB, text and eXIf chunks.
             run():
-                    Opens the image and returns the dictionary of extracted information if successful.
+                    Reads the chunks and returns the dictionary of extracted information if successful.
     """
 
-    def __init__(self, data: bytes | None = None, path_file: str | None = None):
+    def __init__(self, data=None, path_file: str | None = None, fields=None):
         self.path_file = path_file
-        self.data = data
+        self.source = as_source(data, path_file) if data else None
+        # Champs demandes (utils/fields.py), None pour tout extraire
+        self.fields = fields
 
-        self.img = None
         self.img_info = dict()
 
-    def _open_img(self):
-        try:
-            if self.data:
-                img = Image.open(BytesIO(self.data))
-            else:
-                img = Image.open(self.path_file)
-            if img.format != "PNG":
-                raise ValueError("Not a valid PNG file")
-            self.img = img
-        except Exception as e:
-            print(f"Error opening image {self.path_file}: {e}")
+    def _iter_chunks(self):
+        # Chaque chunk : longueur (4 octets), type (4 octets), donnees, CRC (4 octets)
+        pos = len(PNG_SIGNATURE)
+        while pos + 8 <= self.source.size:
+            length, chunk_type = struct.unpack_from(">I4s", self.source.read(pos, 8))
+            yield chunk_type, pos + 8, length
+            if chunk_type == b"IEND":
+                return
+            pos += 12 + length
+
+    def _parse_ihdr(self, data):
+        width, height, depth, color_type, compression, filter_method, interlace = (
+            struct.unpack_from(">IIBBBBB", data)
+        )
+        self.color_type = color_type
+        self.img_info.update(
+            {
+                "Size (width, height)": (width, height),
+                "Color Mode": COLOR_MODES.get((color_type, depth), "Unknown"),
+                "Bit Depth": depth,
+                "Color Type": COLOR_TYPES.get(color_type, color_type),
+                "Compression Method": compression,
+                "Filter Method": filter_method,
+                "Interlace": "Adam7" if interlace == 1 else "None",
+            }
+        )
+
+    def _parse_trns(self, data):
+        if self.color_type == 3:
+            self.img_info["Transparency"] = f"{len(data)} palette alpha entries"
+        elif self.color_type == 0:
+            self.img_info["Transparency"] = struct.unpack_from(">H", data)[0]
+        elif self.color_type == 2:
+            self.img_info["Transparency"] = struct.unpack_from(">HHH", data)
+
+    def _parse_phys(self, data):
+        ppu_x, ppu_y, unit = struct.unpack_from(">IIB", data)
+        self.img_info["Pixels Per Unit"] = (ppu_x, ppu_y)
+        if unit == 1:  # Pixels par metre
+            self.img_info["DPI"] = (round(ppu_x * 0.0254), round(ppu_y * 0.0254))
+
+    def _parse_text(self, data):
+        # tEXt : mot-cle (Latin-1), separateur NUL, texte (Latin-1)
+        keyword, _, text = bytes(data).partition(b"\x00")
+        info = self.img_info.setdefault("Info", {})
+        info[keyword.decode("latin-1")] = text.decode("latin-1")
+
+    def _read_itxt_header(self, offset: int, length: int) -> bytes:
+        header = bytes(self.source.read(offset, min(length, TEXT_HEADER_SIZE)))
+        if length > TEXT_HEADER_SIZE and header.count(b"\x00") < 3:
+            header = bytes(self.source.read(offset, length))
+        return header
+
+    def _parse_ztxt(self, offset: int, length: int):
+        # zTXt : mot-cle, NUL, methode de compression (1 octet), texte compresse
+        # Le texte compresse n'est pas lu ici (voir LazyText)
+        header = bytes(self.source.read(offset, min(length, ZTXT_HEADER_SIZE)))
+        keyword, _, _ = header.partition(b"\x00")
+        start = len(keyword) + 2
+        info = self.img_info.setdefault("Info", {})
+        info[keyword.decode("latin-1")] = LazyText(
+            self.source,
+            offset + start,
+            length - start,
+            "latin-1",
+            self.text_allowance,
+        )
+
+    def _parse_itxt(self, offset: int, length: int):
+        # iTXt : mot-cle, NUL, drapeau de compression, methode, langue, NUL,
+        # mot-cle traduit, NUL, texte UTF-8 (compresse si drapeau = 1)
+        header = self._read_itxt_header(offset, length)
+        keyword, _, rest = header.partition(b"\x00")
+        compressed = rest[:1] == b"\x01"
+        # Langue et mot-cle traduit : ignores
+        rest = rest[2:].partition(b"\x00")[2].partition(b"\x00")[2]
+        start = len(header) - len(rest)
+
+        info = self.img_info.setdefault("Info", {})
+        if compressed:
+            value = LazyText(
+                self.source,
+                offset + start,
+                length - start,
+                "utf-8",
+                self.text_allowance,
+            )
+        else:
+            value = str(
+                self.source.read(offset + start, length - start),
+                "utf-8",
+                errors="replace",
+            )
+        info[keyword.decode("latin-1")] = value
+
+    def _parse_chunk(self, chunk_type: bytes, offset: int, length: int):
+        match chunk_type:
+            case b"IHDR":
+                self._parse_ihdr(self.source.read(offset, 13))
+            case b"PLTE":
+                self.img_info["Palette Entries"] = length // 3
+            case b"tRNS":
+                self._parse_trns(self.source.read(offset, length))
+            case b"pHYs":
+                self._parse_phys(self.source.read(offset, 9))
+            case b"gAMA":
+                gamma = struct.unpack_from(">I", self.source.read(offset, 4))[0]
+                self.img_info["Gamma"] = gamma / 100000
+            case b"sRGB":
+                intent = self.source.read(offset, 1)[0]
+                self.img_info["sRGB Intent"] = SRGB_INTENTS.get(intent, intent)
+            case b"tEXt":
+                self._parse_text(self.source.read(offset, length))
+            case b"zTXt":
+                self._parse_ztxt(offset, length)
+            case b"iTXt":
+                self._parse_itxt(offset, length)
+            case b"eXIf":
+                self.img_info["EXIF"] = decode_exif(
+                    self.source.read(offset, length), self.fields
+                )
+            case _:
+                # IDAT et chunks inconnus : sautes grace a leur longueur
+                pass
+
+    def _text_allowance(self) -> TextAllowance:
+        # Les textes sont decompresses apres l'analyse (a l'affichage) : avec
+        # --max-bytes (utils/budget.py), ils sont bornes par le reste du budget.
+        remaining = MAX_TEXT_TOTAL
+        budget = getattr(self.source, "budget", None)
+        if budget is not None and budget.max_bytes is not None:
+            remaining = min(remaining, budget.max_bytes - budget.bytes_read)
+        return TextAllowance(remaining)
 
     def _extract_infos(self) -> dict:
-        # Taille du fichier complet en bytes (avec Pillow)
-        buf = BytesIO()
-        self.img.save(buf, format=self.img.format)
-        data = buf.getvalue()
+        signature = bytes(self.source.read(0, len(PNG_SIGNATURE)))
+        if signature != PNG_SIGNATURE:
+            raise ValueError("Not a valid PNG file")
 
+        self.color_type = None
+        self.text_allowance = self._text_allowance()
         self.img_info.update(
             {
-                "Signature": buf.getvalue()[:8].hex(" ").upper(),
-                "Format": self.img.format,
-                "Size (width, height)": self.img.size,
-                "Size (bytes)": len(data),
-                "Color Mode": self.img.mode,
-                # "Info": self.img.info,
-                "EXIF": JPGParser.extract_exif(self.path_file),
+                "Signature": signature.hex(" ").upper(),
+                "Format": "PNG",
+                "Size (bytes)": self.source.size,
             }
         )
 
+        for chunk_type, offset, length in self._iter_chunks():
+            try:
+                self._parse_chunk(chunk_type, offset, length)
+            except (ValueError, struct.error, IndexError):
+                # Chunk auxiliaire invalide : ignore, le reste du fichier est lu
+                if chunk_type == b"IHDR":
+                    raise
+                self.img_info.setdefault("Invalid Chunks", []).append(
+                    chunk_type.decode("latin-1")
+                )
+            # IHDR est toujours le premier chunk
+            if self.fields is not None and self.fields.satisfied(self.img_info):
+                break
+
+        if "Size (width, height)" not in self.img_info:
+            raise ValueError("Missing IHDR chunk")
+        self.img_info.setdefault("EXIF", {})
         return self.img_info
 
     def run(self) -> dict:
@@ -72,26 +373,46 @@ class PngReader:
                 dict: Dictionnaire contenant:
                         - Signature (str): Les 8 premiers octets du fichier PNG (signature PNG) en hexadécimal
                             séparés par des espaces, en majuscules. Exemple: "89 50 4E 47 0D 0A 1A 0A".
-                        - Format (str): Format reconnu par Pillow (doit être "PNG").
-                        - Taille (tuple[int,int]): Dimensions de l'image (largeur, hauteur) en pixels.
-                        - Poids (bytes) (int): Taille totale en octets lors de la réécriture complète via Pillow.
-                        - Mode (str): Mode couleur Pillow (ex: "RGB", "RGBA", "P", etc.).
-                        - Info (dict): Métadonnées internes Pillow extraites du chunk IHDR et autres chunks
-                            interprétés (peut contenir par exemple "gamma", "dpi", "interlace", "background",
-                            "transparency", "comment", etc. selon le fichier). Ce contenu dépend des chunks présents.
-                        - EXIF (dict | None): Données EXIF si présentes et reconnues (rare dans PNG), sous forme
-                            de mapping { nom_tag: valeur }. `None` si aucune donnée EXIF disponible.
+                        - Format (str): Toujours "PNG".
+                        - Size (bytes) (int): Taille réelle du fichier sur disque.
+                        - Size (width, height) (tuple[int,int]): Dimensions de l'image en pixels (IHDR).
+                        - Color Mode (str): Mode couleur, mêmes noms que Pillow (ex: "RGB", "RGBA", "P", etc.).
+                        - Bit Depth, Color Type, Compression Method, Filter Method, Interlace: champs de IHDR.
+                        - Palette Entries (int): Nombre de couleurs du chunk PLTE.
+                        - Transparency: Contenu du chunk tRNS.
+                        - Pixels Per Unit / DPI: Résolution du chunk pHYs.
+                        - Gamma (float): Chunk gAMA.
+                        - sRGB Intent (str): Chunk sRGB.
+                        - Info (dict): Textes des chunks tEXt / zTXt / iTXt { mot-clé: texte }.
+                            Les textes compressés sont des LazyText, décompressés
+                            seulement à l'affichage (au plus MAX_TEXT_SIZE octets).
+                        - EXIF (dict): Données EXIF du chunk eXIf, sous forme
+                            { nom_ifd: { nom_tag: valeur } }. Vide si absent.
+                        - Invalid Chunks (list[str]): Types des chunks auxiliaires
+                            illisibles (ignorés), absent si tous sont valides.
 
         Notes:
                 - La signature PNG est toujours: 89 50 4E 47 0D 0A 1A 0A.
-                - Le champ "Size (bytes)" correspond à la taille des données réencodées par Pillow, ce qui
-                    peut différer légèrement de la taille sur disque originale (optimisations, réorganisation).
+                - Aucune donnée de pixel n'est lue : les chunks IDAT sont sautés.
                 - Le champ EXIF est généralement absent dans les PNG (préférer les chunks tEXt / iTXt / zTXt
-                    ou XMP pour les métadonnées). Pillow expose EXIF seulement si présent.
+                    ou XMP pour les métadonnées).
+
+        Lève:
+                ValueError, struct.error: Fichier PNG invalide ou tronqué ; l'erreur
+                        est remontée à l'appelant (résultat "ERROR" dans main.py).
         """
-        self._open_img()
-        if self.img:
-            return self._extract_infos()
+        if self.source is None:
+            with (
+                open(self.path_file, "rb") as f,
+                open_source(f, self.path_file) as self.source,
+            ):
+                return self._extract_infos()
+        return self._extract_infos()
+
+
+def extract(source, filename: str, fields=None) -> dict:
+    """Entry point of the reader registry (see metadata_readers/registry.py)."""
+    return PngReader(source, filename, fields).run()
 
 
 def main():
@@ -104,9 +425,10 @@ def main():
     args = parser.parse_args()
 
     for file in args.image_files:
-        with open(file, "rb") as f:
-            data = f.read()
-        print(f"{PngReader(data=data).run()}")
+        try:
+            print(f"{PngReader(path_file=file).run()}")
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Error opening image {file}: {e}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+import argparse
+import struct
+
+from metadata_readers.ExifTags import IFD_POINTERS, TAGS
+from metadata_readers.IfdReader import IfdReader
+from utils.source import as_source, open_source
+
+COMPRESSIONS = {
+    1: "None",
+    2: "CCITT RLE",
+    3: "CCITT Group 3",
+    4: "CCITT Group 4",
+    5: "LZW",
+    6: "JPEG (old-style)",
+    7: "JPEG",
+    8: "Adobe Deflate",
+    32773: "PackBits",
+    32946: "Deflate",
+    34712: "JPEG 2000",
+    50000: "Zstandard",
+    50001: "WebP",
+}
+
+PHOTOMETRICS = {
+    0: "WhiteIsZero",
+    1: "BlackIsZero",
+    2: "RGB",
+    3: "Palette",
+    4: "Transparency Mask",
+    5: "CMYK",
+    6: "YCbCr",
+    8: "CIELab",
+}
+
+RESOLUTION_UNITS = {1: "None", 2: "Inch", 3: "Centimeter"}
+
+# Tags texte de l'IFD0 reportes dans "Info"
+TEXT_TAGS = (0x010D, 0x010E, 0x010F, 0x0110, 0x011D, 0x0131, 0x0132, 0x013B, 0x8298)
+
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+
+# Nombre maximal d'IFD (pages) suivis : protege contre les chaines d'IFD
+# circulaires ou demesurees.
+MAX_PAGES = 65536
+
+
+def _dpi(value) -> int:
+    # XResolution / YResolution : RATIONAL (num, den), mais certains
+    # encodeurs ecrivent un SHORT ou un LONG
+    if isinstance(value, tuple) and value and isinstance(value[0], tuple):
+        value = value[0]  # Plusieurs valeurs : la premiere compte
+    if isinstance(value, tuple) and len(value) == 2:
+        num, den = value
+        return round(num / den) if den else 0
+    if isinstance(value, int):
+        return value
+    return 0
+
+
+class TiffReader:
+    """
+    TiffReader reads the metadata of TIFF files from their IFD0 only.
+
+    The file is decoded by IfdReader straight from the source: only the
+    IFD entry tables and the values of the tags that are reported are
+    read, strips / tiles (the pixels) are never touched.
+    Following the next-IFD links gives the page count, 6 bytes per page.
+
+    Attributes:
+            path_file (str): Path to the TIFF file.
+            source (ByteSource|None): Seekable source over the TIFF content.
+            img_info (dict): Dictionary containing extracted image information.
+            fields (FieldSelection|None): Requested fields; the walk stops
+                    once they are all found.
+    """
+
+    def __init__(self, data=None, path_file: str | None = None, fields=None):
+        self.path_file = path_file
+        self.source = as_source(data, path_file) if data else None
+        # Champs demandes (utils/fields.py), None pour tout extraire
+        self.fields = fields
+
+        self.img_info = dict()
+
+    def _count_pages(self, ifd_offset: int) -> int:
+        pages = 0
+        visited = set()
+        while ifd_offset and ifd_offset not in visited and pages < MAX_PAGES:
+            visited.add(ifd_offset)
+            header = self.reader.read(ifd_offset, 2)
+            if len(header) < 2:
+                break
+            count = struct.unpack_from(self.reader.endian + "H", header)[0]
+            next_offset = self.reader.read(ifd_offset + 2 + 12 * count, 4)
+            pages += 1
+            if len(next_offset) < 4:
+                break
+            ifd_offset = struct.unpack_from(self.reader.endian + "I", next_offset)[0]
+        return pages
+
+    def _extract_infos(self) -> dict:
+        # Le fichier entier est la structure TIFF : les valeurs sont lues
+        # directement dans la source, a la demande.
+        self.reader = IfdReader(self.source)
+        entries = self.reader.ifd0
+        if entries is None:
+            raise ValueError("IFD0 offset out of file")
+        width, height = entries.get(0x0100), entries.get(0x0101)
+        if width is None or height is None:
+            raise ValueError("Missing image dimensions in IFD0")
+
+        self.img_info.update(
+            {
+                "Format": "TIFF",
+                "Byte Order": (
+                    "Little-endian (II)"
+                    if self.reader.endian == "<"
+                    else "Big-endian (MM)"
+                ),
+                "Size (bytes)": self.source.size,
+                "Size (width, height)": (width, height),
+                "Bits Per Sample": entries.get(0x0102, 1),
+                "Samples Per Pixel": entries.get(0x0115, 1),
+            }
+        )
+        if self.fields is not None and self.fields.satisfied(self.img_info):
+            return self.img_info
+        compression = entries.get(0x0103, 1)
+        self.img_info["Compression"] = COMPRESSIONS.get(compression, compression)
+        if 0x0106 in entries:
+            photometric = entries.get(0x0106)
+            self.img_info["Photometric Interpretation"] = PHOTOMETRICS.get(
+                photometric, photometric
+            )
+        if 0x011C in entries:
+            self.img_info["Planar Configuration"] = (
+                "Planar" if entries.get(0x011C) == 2 else "Chunky"
+            )
+        if 0x0112 in entries:
+            self.img_info["Orientation"] = entries.get(0x0112)
+        resolution = (entries.get(0x011A), entries.get(0x011B))
+        if None not in resolution:
+            unit = entries.get(0x0128, 2)
+            self.img_info["Resolution"] = resolution
+            self.img_info["Resolution Unit"] = RESOLUTION_UNITS.get(unit, unit)
+            if unit == 2:
+                self.img_info["DPI"] = tuple(_dpi(value) for value in resolution)
+        self.img_info["Page Count"] = self._count_pages(entries.offset)
+
+        info = {TAGS[tag]: entries.get(tag) for tag in TEXT_TAGS if tag in entries}
+        if info:
+            self.img_info["Info"] = info
+
+        # Sous-IFD EXIF / GPS : l'IFD0 (offsets des bandes, ...) n'est pas repris
+        exif = {}
+        for tag in (EXIF_IFD, GPS_IFD):
+            sub = entries.sub_ifd(tag)
+            if sub is not None:
+                sub.to_dict(IFD_POINTERS[tag][0], exif, {entries.offset})
+        self.img_info["EXIF"] = exif
+        return self.img_info
+
+    def run(self) -> dict:
+        """
+        Reads the TIFF header and IFD0, and returns the extracted information.
+
+        Returns:
+                dict: Format, Byte Order, Size (bytes), Size (width, height),
+                        Bits Per Sample, Samples Per Pixel, Compression,
+                        Photometric Interpretation, Planar Configuration,
+                        Orientation, Resolution / Resolution Unit / DPI,
+                        Page Count (number of IFDs) and Info (text tags:
+                        Make, Model, Software, DateTime, ...).
+                        EXIF (dict): Exif and GPSInfo sub-IFDs, empty if absent.
+
+        Raises:
+                ValueError, struct.error: If the file is not a valid TIFF file.
+        """
+        if self.source is None:
+            with (
+                open(self.path_file, "rb") as f,
+                open_source(f, self.path_file) as self.source,
+            ):
+                return self._extract_infos()
+        return self._extract_infos()
+
+
+def extract(source, filename: str, fields=None) -> dict:
+    """Entry point of the reader registry (see metadata_readers/registry.py)."""
+    return TiffReader(source, filename, fields).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="scorpion", description="reading metadata of images file"
+    )
+    parser.add_argument(
+        "image_files", nargs="+", help="list of image files in these formats : [.tif]"
+    )
+    args = parser.parse_args()
+
+    for file in args.image_files:
+        try:
+            print(f"{TiffReader(path_file=file).run()}")
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Error opening image {file}: {e}")
+
+
+if __name__ == "__main__":
+    main()
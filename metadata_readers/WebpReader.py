@@ -0,0 +1,204 @@
+import argparse
+import struct
+
+from metadata_readers.IfdReader import decode_exif
+from utils.source import as_source, open_source
+
+# En-tete RIFF : "RIFF", taille (4 octets LE), "WEBP"
+RIFF_HEADER_SIZE = 12
+
+# Drapeaux du chunk VP8X
+VP8X_ICC = 0x20
+VP8X_ALPHA = 0x10
+VP8X_EXIF = 0x08
+VP8X_XMP = 0x04
+VP8X_ANIMATION = 0x02
+
+VP8_START_CODE = b"\x9d\x01\x2a"
+VP8L_SIGNATURE = 0x2F
+
+SIZE_KEY = "Size (width, height)"
+
+
+class WebpReader:
+    """
+    WebpReader reads the metadata of WebP files (lossy, lossless and extended).
+
+    The RIFF container is walked chunk by chunk using the chunk lengths:
+    only the chunk headers, the few bytes of the VP8 / VP8L / VP8X headers
+    that hold the dimensions, the ANIM / ANMF headers and the EXIF chunk
+    are read. The compressed bitstream is never decoded.
+
+    Attributes:
+            path_file (str): Path to the WebP file.
+            source (ByteSource|None): Seekable source over the WebP content.
+            img_info (dict): Dictionary containing extracted image information.
+            fields (FieldSelection|None): Requested fields; the walk stops
+                    once they are all found.
+    """
+
+    def __init__(self, data=None, path_file: str | None = None, fields=None):
+        self.path_file = path_file
+        self.source = as_source(data, path_file) if data else None
+        # Champs demandes (utils/fields.py), None pour tout extraire
+        self.fields = fields
+
+        self.img_info = dict()
+
+    def _iter_chunks(self):
+        # Chaque chunk : FourCC (4 octets), longueur (4 octets LE), donnees
+        # completees a une longueur paire.
+        riff_size = struct.unpack_from("<I", self.source.read(4, 4))[0]
+        end = min(self.source.size, 8 + riff_size)
+        pos = RIFF_HEADER_SIZE
+        while pos + 8 <= end:
+            fourcc, length = struct.unpack_from("<4sI", self.source.read(pos, 8))
+            yield fourcc, pos + 8, length
+            pos += 8 + length + (length & 1)
+
+    def _parse_vp8(self, offset: int):
+        # Trame cle VP8 : tag de 3 octets, code de debut 9D 01 2A, puis
+        # largeur et hauteur sur 14 bits (2 bits d'echelle).
+        data = self.source.read(offset, 10)
+        if bytes(data[3:6]) != VP8_START_CODE:
+            raise ValueError("Invalid VP8 frame header")
+        width, height = struct.unpack_from("<HH", data, 6)
+        return width & 0x3FFF, height & 0x3FFF
+
+    def _parse_vp8l(self, offset: int):
+        # VP8L : signature 0x2F, puis largeur-1 et hauteur-1 sur 14 bits,
+        # drapeau alpha (1 bit), version (3 bits).
+        data = self.source.read(offset, 5)
+        if data[0] != VP8L_SIGNATURE:
+            raise ValueError("Invalid VP8L header")
+        bits = int.from_bytes(data[1:5], "little")
+        self.img_info["Alpha"] = bool(bits >> 28 & 1)
+        return (bits & 0x3FFF) + 1, (bits >> 14 & 0x3FFF) + 1
+
+    def _parse_vp8x(self, offset: int):
+        # VP8X : drapeaux (1 octet), reserve (3 octets), largeur-1 et
+        # hauteur-1 sur 24 bits.
+        data = self.source.read(offset, 10)
+        flags = data[0]
+        self.img_info.update(
+            {
+                "Alpha": bool(flags & VP8X_ALPHA),
+                "Animation": bool(flags & VP8X_ANIMATION),
+                "ICC Profile": bool(flags & VP8X_ICC),
+                "Has EXIF": bool(flags & VP8X_EXIF),
+                "Has XMP": bool(flags & VP8X_XMP),
+            }
+        )
+        width = int.from_bytes(data[4:7], "little") + 1
+        height = int.from_bytes(data[7:10], "little") + 1
+        return width, height
+
+    def _extract_infos(self) -> dict:
+        header = bytes(self.source.read(0, RIFF_HEADER_SIZE))
+        if header[:4] != b"RIFF" or header[8:12] != b"WEBP":
+            raise ValueError("Not a valid WebP file")
+
+        self.img_info.update(
+            {
+                "Format": "WEBP",
+                "Size (bytes)": self.source.size,
+                SIZE_KEY: None,
+                "Compression": None,
+            }
+        )
+        frames = 0
+        duration = 0
+        for fourcc, offset, length in self._iter_chunks():
+            match fourcc:
+                case b"VP8X":
+                    # Toujours le premier chunk d'un fichier etendu
+                    self.img_info[SIZE_KEY] = self._parse_vp8x(offset)
+                    self.img_info["Compression"] = "Extended (VP8X)"
+                case b"VP8 ":
+                    size = self._parse_vp8(offset)
+                    self.img_info[SIZE_KEY] = self.img_info[SIZE_KEY] or size
+                    self.img_info["Compression"] = "Lossy (VP8)"
+                case b"VP8L":
+                    size = self._parse_vp8l(offset)
+                    self.img_info[SIZE_KEY] = self.img_info[SIZE_KEY] or size
+                    self.img_info["Compression"] = "Lossless (VP8L)"
+                case b"ANIM":
+                    # Couleur de fond (4 octets), nombre de boucles (2 octets)
+                    data = self.source.read(offset, 6)
+                    self.img_info["Loop Count"] = struct.unpack_from("<H", data, 4)[0]
+                case b"ANMF":
+                    # Position (2 x 24 bits), taille (2 x 24 bits), duree (24 bits)
+                    data = self.source.read(offset, 15)
+                    frames += 1
+                    duration += int.from_bytes(data[12:15], "little")
+                case b"ICCP":
+                    self.img_info["ICC Profile Size"] = length
+                case b"EXIF":
+                    self.img_info["EXIF"] = decode_exif(
+                        self.source.read(offset, length), self.fields
+                    )
+                case b"XMP ":
+                    self.img_info["XMP Size"] = length
+                case _:
+                    # ALPH et chunks inconnus : sautes grace a leur longueur
+                    pass
+            if self.fields is not None and self.fields.satisfied(self.img_info):
+                break
+
+        if self.img_info[SIZE_KEY] is None:
+            raise ValueError("Missing VP8 / VP8L / VP8X chunk")
+        if frames:
+            self.img_info["Frame Count"] = frames
+            self.img_info["Duration (ms)"] = duration
+        self.img_info.setdefault("EXIF", {})
+        return self.img_info
+
+    def run(self) -> dict:
+        """
+        Walks the RIFF chunks and returns the extracted information.
+
+        Returns:
+                dict: Format, Size (bytes), Compression (lossy VP8 or lossless
+                        VP8L bitstream), Size (width, height) (canvas size for
+                        extended files), Alpha, and for extended (VP8X) files the
+                        feature flags, Loop Count, Frame Count and Duration (ms)
+                        of animations, ICC Profile Size, XMP Size.
+                        EXIF (dict): { ifd_name: { tag_name: value } }, empty
+                        if absent.
+
+        Raises:
+                ValueError, struct.error, IndexError: If the file is not a
+                        valid WebP file.
+        """
+        if self.source is None:
+            with (
+                open(self.path_file, "rb") as f,
+                open_source(f, self.path_file) as self.source,
+            ):
+                return self._extract_infos()
+        return self._extract_infos()
+
+
+def extract(source, filename: str, fields=None) -> dict:
+    """Entry point of the reader registry (see metadata_readers/registry.py)."""
+    return WebpReader(source, filename, fields).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="scorpion", description="reading metadata of images file"
+    )
+    parser.add_argument(
+        "image_files", nargs="+", help="list of image files in these formats : [.webp]"
+    )
+    args = parser.parse_args()
+
+    for file in args.image_files:
+        try:
+            print(f"{WebpReader(path_file=file).run()}")
+        except (OSError, ValueError, struct.error, IndexError) as e:
+            print(f"Error opening image {file}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import importlib
+
+# Signatures enregistrees : (nombre d'octets testes, parties, format), triees
+# de la plus longue a la plus courte. Une partie est (offset, octets).
+_signatures = []
+
+# Format -> point d'entree "module:fonction" (ou fonction), importe au premier
+# fichier de ce format.
+ENTRY_POINTS = {}
+
+# Points d'entree deja importes
+_loaded = {}
+
+
+def register_format(file_format: str, entry_point, signatures):
+    """
+    Registers a reader for a file format.
+
+    The entry point has the signature
+    extract(source: ByteSource, filename: str, fields=None) -> dict and
+    raises if the file cannot be read. `fields` (utils/fields.py) lets the
+    reader stop once the requested fields are found; it may be ignored,
+    the result is projected afterwards. Given as a "module:function" string, its module
+    is imported the first time a file of this format shows up: a run over
+    BMP and GIF files only never imports the other readers.
+
+    Usage (third-party reader):
+            register_format("QOI", "my_readers.qoi:extract", [b"qoif"])
+            register_format("AVI", extract_avi, [((0, b"RIFF"), (8, b"AVI "))])
+
+    Args:
+            file_format (str): Name reported for the format (e.g. "PNG").
+            entry_point (str|callable): "module:function" or the function itself.
+            signatures (list): Magic numbers of the format. Each one is a
+                    bytes prefix, or a sequence of (offset, bytes) parts that
+                    must all match (e.g. RIFF containers). Every part must lie
+                    within the first HEADER_PREFIX_SIZE bytes (utils/source.py).
+
+    Registering a format again replaces its entry point and its signatures.
+    """
+    ENTRY_POINTS[file_format] = entry_point
+    _loaded.pop(file_format, None)
+    # Les anciennes signatures du format ne doivent plus l'identifier
+    _signatures[:] = [entry for entry in _signatures if entry[2] != file_format]
+    for signature in signatures:
+        if isinstance(signature, bytes):
+            signature = ((0, signature),)
+        parts = tuple(signature)
+        length = sum(len(part) for _, part in parts)
+        _signatures.append((length, parts, file_format))
+    # Plus longue signature d'abord : "RIFF....WEBP" passe avant "RIFF".
+    _signatures.sort(key=lambda entry: entry[0], reverse=True)
+
+
+def identify_format(data: bytes) -> str:
+    """
+    Returns the format with the longest signature matching `data`, or "UNKNOWN".
+
+    Args:
+            data (bytes): First bytes of the file (see HEADER_PREFIX_SIZE in
+                    utils/source.py).
+    """
+    for _, parts, file_format in _signatures:
+        if all(data.startswith(part, offset) for offset, part in parts):
+            return file_format
+    return "UNKNOWN"
+
+
+def get_extractor(file_format: str):
+    """
+    Returns the extract() entry point of a format, importing its reader
+    module on first use.
+
+    Raises:
+            KeyError: If no reader is registered for `file_format`.
+    """
+    extractor = _loaded.get(file_format)
+    if extractor is None:
+        extractor = ENTRY_POINTS[file_format]
+        if isinstance(extractor, str):
+            module_name, _, function_name = extractor.partition(":")
+            extractor = getattr(importlib.import_module(module_name), function_name)
+        _loaded[file_format] = extractor
+    return extractor
+
+
+def preload():
+    """Imports every registered reader, e.g. in long-lived worker processes."""
+    for file_format in ENTRY_POINTS:
+        get_extractor(file_format)
+
+
+register_format("PNG", "metadata_readers.PngReader:extract", [b"\x89PNG\r\n\x1a\n"])
+register_format("BMP", "metadata_readers.BmpReader:extract", [b"BM"])
+register_format("GIF", "metadata_readers.GifReader:extract", [b"GIF87a", b"GIF89a"])
+register_format("JPEG", "metadata_readers.JpgReader:extract", [b"\xff\xd8\xff"])
+# Ordre des octets : "II" little-endian, "MM" big-endian, puis 42
+register_format("TIFF", "metadata_readers.TiffReader:extract", [b"II*\x00", b"MM\x00*"])
+register_format(
+    "WEBP", "metadata_readers.WebpReader:extract", [((0, b"RIFF"), (8, b"WEBP"))]
+)
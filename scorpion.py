@@ -0,0 +1,190 @@
+import os
+
+from utils.archive import expand_archives
+from utils.budget import ABORTED_KEY, parse_budget
+from utils.fields import parse_fields
+from utils.processing import (
+    process_content,
+    process_file,
+    process_files,
+    process_item,
+    process_source,
+    project_result,
+)
+from utils.source import open_source
+
+# Nom des resultats d'un contenu passe sans nom (bytes, fichier ouvert)
+DATA_NAME = "<data>"
+
+
+class ExtractionResult:
+    """
+    Result of the analysis of one file, as returned by extract() and
+    extract_many().
+
+    Usage:
+            import scorpion
+
+            result = scorpion.extract("photo.jpg")
+            if result.ok:
+                    print(result.format, result.metadata["Size (width, height)"])
+            else:
+                    print(result.path, result.error)
+
+    Attributes:
+            path (str): Path of the file, or the name given with its content.
+            format (str): "PNG", "BMP", "GIF", "JPEG", "TIFF", "WEBP", or
+                    "UNKNOWN" / "ERROR" (see `error`).
+            metadata (dict|None): Metadata, as printed by main.py (None on
+                    error). A file over its byte / time budget has an
+                    "Aborted" entry (see `aborted`).
+            error (str|None): Error message, None on success.
+    """
+
+    __slots__ = ("path", "format", "metadata", "error")
+
+    def __init__(self, path: str, format: str, metadata=None, error=None):
+        self.path = path
+        self.format = format
+        self.metadata = metadata
+        self.error = error
+
+    @classmethod
+    def from_tuple(cls, result: tuple):
+        """Builds the result of a process_file() tuple (utils/processing.py)."""
+        file, extension, metadata = result
+        if extension == "UNKNOWN":
+            return cls(file, extension, error="extension of file unknown")
+        if extension == "ERROR":
+            return cls(file, extension, error=metadata)
+        return cls(file, extension, metadata)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def aborted(self) -> bool:
+        """True if the analysis stopped on the --max-bytes / --timeout budget."""
+        return isinstance(self.metadata, dict) and ABORTED_KEY in self.metadata
+
+    def __repr__(self):
+        if self.error is not None:
+            return f"ExtractionResult({self.path!r}, {self.format!r}, error={self.error!r})"
+        return f"ExtractionResult({self.path!r}, {self.format!r}, {self.metadata!r})"
+
+
+def _options(fields, max_bytes, timeout):
+    if isinstance(fields, str):
+        fields = [fields]
+    return parse_fields(fields), parse_budget(max_bytes, timeout)
+
+
+def _normalize_item(item, pickled: bool = False):
+    # Elements de extract_many() : chemin, contenu ou (nom, contenu)
+    if isinstance(item, os.PathLike):
+        return os.fspath(item)
+    if isinstance(item, (bytes, bytearray, memoryview)):
+        item = DATA_NAME, item
+    if pickled and isinstance(item, tuple) and isinstance(item[1], memoryview):
+        # Envoyes aux workers : une memoryview ne se serialise pas (pickle)
+        item = item[0], bytes(item[1])
+    return item
+
+
+def extract(source, name: str | None = None, fields=None, max_bytes=None, timeout=None):
+    """
+    Extracts the metadata of one file. Never raises on a bad file: the
+    error is reported in the result.
+
+    Args:
+            source (str|PathLike|bytes|BinaryIO): Path of the file, its
+                    content, or a binary file object (read from its start,
+                    whatever its current position, memory-mapped when
+                    possible).
+            name (str|None): Name reported in the result for a content or a
+                    file object (defaults to the path, or "<data>").
+            fields (str|list[str]|None): Requested fields, as with --fields
+                    (e.g. "dimensions,DPI"); readers stop once they are found.
+            max_bytes (int|None): Maximum number of bytes read (--max-bytes).
+            timeout (float|None): Maximum analysis time in seconds (--timeout).
+
+    Returns:
+            ExtractionResult: Metadata or error of the file.
+    """
+    fields, budget = _options(fields, max_bytes, timeout)
+    if isinstance(source, (str, os.PathLike)):
+        result = process_file(os.fspath(source), fields, budget)
+        if name is not None:
+            result = (name, *result[1:])
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        result = process_content(name or DATA_NAME, source, fields, budget)
+    else:
+        # Le chemin du fichier ouvert permet aux lecteurs de le relire
+        path = getattr(source, "name", None)
+        path = path if isinstance(path, str) else None
+        name = name or path or DATA_NAME
+        try:
+            with open_source(source, path) as byte_source:
+                result = process_source(byte_source, name, fields, budget)
+        except Exception as e:
+            result = name, "ERROR", f"{type(e).__name__}: {e}"
+    return ExtractionResult.from_tuple(project_result(result, fields))
+
+
+def extract_many(
+    items,
+    workers: int = 1,
+    ordered: bool = True,
+    fields=None,
+    max_bytes=None,
+    timeout=None,
+    archives: bool = False,
+):
+    """
+    Lazily extracts the metadata of many files, like `main.py -j`.
+
+    Results are yielded as the caller consumes them: at most `workers * 4`
+    items are in flight (none ahead of the caller with workers=1), so
+    `items` can be a generator over millions of files and the caller
+    controls the pace (backpressure). A bad file yields an
+    ExtractionResult with `error` set, the iteration goes on.
+
+    Usage:
+            for result in scorpion.extract_many(paths, workers=8, ordered=False):
+                    if result.ok:
+                            index(result.path, result.metadata)
+
+    Args:
+            items (iterable): Paths, contents (bytes, bytearray, memoryview),
+                    or (name, content) pairs. Contents are sent to the worker
+                    processes (memoryviews are copied), prefer paths for
+                    large files.
+            workers (int): Number of worker processes (1: this process).
+            ordered (bool): Yield results in the order of `items`; with
+                    False, as soon as each file is done.
+            fields (str|list[str]|None): See extract().
+            max_bytes (int|None): See extract().
+            timeout (float|None): See extract().
+            archives (bool): Replace the zip / tar archives among the paths
+                    by their members, named "archive.zip!member" (see
+                    utils/archive.py).
+
+    Yields:
+            ExtractionResult: One result per item.
+    """
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    fields, budget = _options(fields, max_bytes, timeout)
+    items = (_normalize_item(item, workers > 1) for item in items)
+    if archives:
+        items = expand_archives(items)
+    for result in process_files(
+        items,
+        workers,
+        ordered=ordered,
+        fields=fields,
+        budget=budget,
+        worker=process_item,
+    ):
+        yield ExtractionResult.from_tuple(project_result(result, fields))
@@ -0,0 +1,292 @@
+import io
+import os
+from fnmatch import fnmatch
+
+# Separateur entre l'archive et le membre dans les noms affiches
+MEMBER_SEPARATOR = "!"
+# Fichiers traites comme des archives avec --archives
+ARCHIVE_PATTERNS = (
+    "*.zip",
+    "*.tar",
+    "*.tar.gz",
+    "*.tgz",
+    "*.tar.bz2",
+    "*.tbz2",
+    "*.tar.xz",
+    "*.txz",
+)
+# Archives zip gardees ouvertes par processus (repertoire central deja lu)
+OPEN_ZIP_FILES = 8
+# Au-dela de cette taille, un membre d'un tar compresse (ou creux) est
+# copie dans un fichier temporaire, lu par le worker, au lieu d'etre charge
+# en memoire
+MAX_MEMBER_READ = 16 * 1024 * 1024
+# Taille des lectures lors de cette copie
+COPY_BUFFER_SIZE = 1024 * 1024
+
+_zip_files = {}
+# Un processus fils (worker) ne partage pas les archives ouvertes par le
+# parent : la position dans le fichier serait commune aux deux.
+os.register_at_fork(after_in_child=_zip_files.clear)
+
+
+class ArchiveMember:
+    """
+    Reference to a file stored in a zip or uncompressed tar archive, sent
+    to the workers instead of its content (see open_member()).
+
+    str(member) is the name reported in the results: "archive.zip!dir/a.jpg".
+
+    Args:
+            archive (str): Path of the archive.
+            name (str): Path of the member in the archive.
+            offset (int|None): Offset of the content in a tar archive, None
+                    for a zip archive.
+            size (int|None): Size of the content (uncompressed).
+            copy (str|None): Temporary file holding the content of a large
+                    member of a compressed tar, removed by release_member().
+    """
+
+    __slots__ = ("archive", "name", "offset", "size", "copy")
+
+    def __init__(self, archive: str, name: str, offset=None, size=None, copy=None):
+        self.archive = archive
+        self.name = name
+        self.offset = offset
+        self.size = size
+        self.copy = copy
+
+    def __str__(self):
+        return f"{self.archive}{MEMBER_SEPARATOR}{self.name}"
+
+    def __repr__(self):
+        return f"ArchiveMember({str(self)!r})"
+
+
+class MemberFile(io.RawIOBase):
+    """
+    Read-only, seekable file object over a byte range of another file (the
+    content of a member of an uncompressed tar). Closing it closes `file`.
+
+    Args:
+            file (BinaryIO): Seekable binary file object (the archive).
+            offset (int): Start of the range.
+            size (int): Length of the range.
+    """
+
+    def __init__(self, file, offset: int, size: int):
+        self.file = file
+        self.offset = offset
+        self.size = size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+    def seekable(self):
+        return True
+
+    def seek(self, position: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            position += self.position
+        elif whence == os.SEEK_END:
+            position += self.size
+        if position < 0:
+            raise ValueError("negative seek position")
+        self.position = position
+        return position
+
+    def tell(self) -> int:
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        size = max(0, min(len(buffer), self.size - self.position))
+        if size == 0:
+            return 0
+        self.file.seek(self.offset + self.position)
+        read = self.file.readinto(memoryview(buffer)[:size])
+        self.position += read
+        return read
+
+
+def is_archive(path: str) -> bool:
+    name = os.path.basename(path).lower()
+    return any(fnmatch(name, pattern) for pattern in ARCHIVE_PATTERNS)
+
+
+def _member_selected(name: str, include, exclude) -> bool:
+    # Memes regles que utils/walker.is_selected(), chemins relatifs a l'archive
+    parts = name.split("/")
+    if exclude:
+        for index, part in enumerate(parts):
+            prefix = "/".join(parts[: index + 1])
+            if any(fnmatch(part, p) or fnmatch(prefix, p) for p in exclude):
+                return False
+    if include:
+        return any(fnmatch(parts[-1], p) or fnmatch(name, p) for p in include)
+    return True
+
+
+def _open_zip(path: str):
+    import zipfile
+
+    archive = _zip_files.pop(path, None)
+    if archive is None:
+        archive = zipfile.ZipFile(path)
+        if len(_zip_files) >= OPEN_ZIP_FILES:
+            _zip_files.pop(next(iter(_zip_files))).close()
+    _zip_files[path] = archive  # Plus recemment utilisee en dernier
+    return archive
+
+
+def _iter_zip(path: str, include, exclude):
+    for info in _open_zip(path).infolist():
+        if not info.is_dir() and _member_selected(info.filename, include, exclude):
+            yield ArchiveMember(path, info.filename, size=info.file_size)
+
+
+def _read_member(path: str, archive, info, copies: list):
+    # Contenu d'un membre sans acces direct : en memoire s'il est petit,
+    # sinon copie par blocs dans un fichier temporaire
+    import shutil
+    import tempfile
+
+    member = archive.extractfile(info)
+    if info.size <= MAX_MEMBER_READ:
+        return f"{path}{MEMBER_SEPARATOR}{info.name}", member.read()
+    fd, copy = tempfile.mkstemp(prefix="scorpion-")
+    try:
+        with open(fd, "wb") as f:
+            shutil.copyfileobj(member, f, COPY_BUFFER_SIZE)
+    except BaseException:
+        _remove(copy)
+        raise
+    copies.append(copy)
+    return ArchiveMember(path, info.name, 0, info.size, copy)
+
+
+def _iter_tar(path: str, include, exclude):
+    import tarfile
+
+    try:
+        archive = tarfile.open(path, "r:")
+    except tarfile.ReadError:
+        archive = None
+    copies = []
+    try:
+        if archive is not None:
+            # Tar non compresse : les membres sont lus sur place (offset, taille)
+            with archive:
+                for info in archive:
+                    if info.isfile() and _member_selected(info.name, include, exclude):
+                        if info.issparse():
+                            yield _read_member(path, archive, info, copies)
+                        else:
+                            yield ArchiveMember(
+                                path, info.name, info.offset_data, info.size
+                            )
+            return
+
+        # Tar compresse : pas d'acces direct, les membres sont decompresses
+        # dans l'ordre, en un seul passage
+        with tarfile.open(path, "r|*") as archive:
+            for info in archive:
+                if info.isfile() and _member_selected(info.name, include, exclude):
+                    yield _read_member(path, archive, info, copies)
+    except GeneratorExit:
+        # Parcours interrompu : les copies pas encore analysees ne seront
+        # jamais liberees par un worker
+        for copy in copies:
+            _remove(copy)
+        raise
+
+
+def iter_archive(path: str, include=None, exclude=None):
+    """
+    Lazily yields the files stored in a zip or tar archive.
+
+    Members of zip and uncompressed tar archives are yielded as
+    ArchiveMember references: the workers open them with open_member()
+    and the readers only read the bytes they need. Compressed tars
+    (.tar.gz, .tar.bz2, .tar.xz) can only be decompressed in order, so
+    their members are read here, one at a time, and yielded as
+    ("archive.tar.gz!member", content) pairs; a member larger than
+    MAX_MEMBER_READ is copied to a temporary file instead, yielded as an
+    ArchiveMember to pass to release_member() once analysed.
+
+    Args:
+            path (str): Path of the archive.
+            include (list[str]|None): Patterns of the members to keep,
+                    matched against their name or path in the archive.
+            exclude (list[str]|None): Patterns of the members or
+                    directories to skip.
+
+    Yields:
+            ArchiveMember|tuple: One item per regular file, or a single
+                    (path, exception) pair if the archive cannot be read
+                    (after the members read before the error).
+    """
+    # zipfile et tarfile ne sont importes qu'avec --archives (demarrage de
+    # main.py)
+    import tarfile
+    import zipfile
+
+    try:
+        if path.lower().endswith(".zip"):
+            yield from _iter_zip(path, include, exclude)
+        else:
+            yield from _iter_tar(path, include, exclude)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+        yield path, e
+
+
+def expand_archives(files, include=None, exclude=None):
+    """
+    Replaces the archives among `files` by their members (see iter_archive()).
+
+    Other files (and items that are not paths) are yielded unchanged, in
+    order.
+    """
+    for file in files:
+        if isinstance(file, str) and is_archive(file):
+            yield from iter_archive(file, include, exclude)
+        else:
+            yield file
+
+
+def open_member(member: ArchiveMember):
+    """
+    Opens a member of a zip or uncompressed tar archive.
+
+    Zip archives stay open in the process (see OPEN_ZIP_FILES), so their
+    central directory is read once per worker.
+
+    Returns:
+            BinaryIO: Seekable file object over the content of the member,
+                    to close after use.
+    """
+    if member.copy is not None:
+        return open(member.copy, "rb")
+    if member.offset is None:
+        return _open_zip(member.archive).open(member.name)
+    return io.BufferedReader(
+        MemberFile(open(member.archive, "rb"), member.offset, member.size)
+    )
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def release_member(member: ArchiveMember):
+    """Removes the temporary copy of a member (see iter_archive()), if any."""
+    if member.copy is not None:
+        _remove(member.copy)
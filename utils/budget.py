@@ -0,0 +1,128 @@
+import time
+
+from utils.source import HEADER_PREFIX_SIZE, ByteSource
+
+# Cle ajoutee aux metadonnees d'un fichier dont l'analyse a ete interrompue
+ABORTED_KEY = "Aborted"
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised when the analysis of a file goes over its ParseBudget.
+
+    process_source() (utils/processing.py) turns it into an {"Aborted": ...}
+    result (see as_dict()) instead of an error, readers walking a file sequentially
+    (GifReader) keep the metadata found so far next to it.
+    """
+
+    def __init__(self, reason: str, bytes_read: int, elapsed: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.bytes_read = bytes_read
+        self.elapsed = elapsed
+
+    def as_dict(self) -> dict:
+        return {
+            "Reason": self.reason,
+            "Bytes Read": self.bytes_read,
+            "Elapsed (ms)": round(self.elapsed * 1000, 1),
+        }
+
+
+class ParseBudget:
+    """
+    Per-file limits of the analysis: bytes read from the file and wall-clock
+    time.
+
+    The limits are checked on each read() of a BudgetedSource, and by the
+    readers that index the content directly (charge()), so a crafted file
+    cannot make a worker scan gigabytes or loop for minutes. The object is
+    picklable: it is sent to the worker processes with each file, and
+    start() resets the counters.
+
+    Usage:
+            budget = ParseBudget(max_bytes=64 * 1024 * 1024, max_seconds=2)
+            source = BudgetedSource(source, budget.start())
+
+    Args:
+            max_bytes (int|None): Maximum number of bytes read per file.
+            max_seconds (float|None): Maximum analysis time per file.
+    """
+
+    def __init__(self, max_bytes: int | None = None, max_seconds=None):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.bytes_read = 0
+        self.started = 0.0
+        self.deadline = None
+
+    def __bool__(self):
+        return self.max_bytes is not None or self.max_seconds is not None
+
+    def start(self):
+        """Resets the counters for a new file and returns the budget."""
+        self.bytes_read = 0
+        self.started = time.monotonic()
+        if self.max_seconds is not None:
+            self.deadline = self.started + self.max_seconds
+        return self
+
+    def charge(self, size: int):
+        """
+        Counts `size` more bytes read and checks both limits.
+
+        Raises:
+                BudgetExceeded: If a limit is exceeded.
+        """
+        self.bytes_read += size
+        if self.max_bytes is not None and self.bytes_read > self.max_bytes:
+            self._exceeded(f"read budget of {self.max_bytes} bytes exceeded")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self._exceeded(f"time budget of {self.max_seconds} s exceeded")
+
+    def _exceeded(self, reason: str):
+        raise BudgetExceeded(reason, self.bytes_read, time.monotonic() - self.started)
+
+
+class BudgetedSource(ByteSource):
+    """
+    Byte source that charges every read() to a ParseBudget.
+
+    Wraps the source of a file for the readers; `source` gives access to
+    the wrapped one (e.g. for a reader that walks the content itself and
+    calls budget.charge()).
+
+    Args:
+            source (ByteSource): Source of the file.
+            budget (ParseBudget): Started budget of the file.
+    """
+
+    def __init__(self, source: ByteSource, budget: ParseBudget):
+        self.source = source
+        self.budget = budget
+        self.path = source.path
+        self.size = source.size
+
+    @property
+    def file(self):
+        return self.source.file
+
+    def read(self, offset: int, size: int):
+        data = self.source.read(offset, size)
+        self.budget.charge(len(data))
+        return data
+
+    def prefix(self, size: int = HEADER_PREFIX_SIZE) -> bytes:
+        # Identification du format : hors budget
+        return self.source.prefix(size)
+
+
+def parse_budget(max_bytes=None, max_seconds=None):
+    """
+    Builds the ParseBudget of the --max-bytes / --timeout options.
+
+    Returns:
+            ParseBudget|None: None if no limit was given.
+    """
+    budget = ParseBudget(max_bytes, max_seconds)
+    return budget or None
@@ -0,0 +1,273 @@
+import json
+import os
+import time
+
+from utils.budget import ABORTED_KEY
+
+# Taille maximale par defaut du cache (somme des resultats stockes)
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+# Nombre d'ecritures entre deux commits SQLite
+COMMIT_INTERVAL = 500
+
+# Version de l'encodage des resultats, partie de la cle des entrees : a
+# changer quand l'encodage ou la forme des resultats des lecteurs change,
+# les entrees d'une autre version ne sont plus lues (puis evincees).
+CACHE_FORMAT = 2
+
+# Balises JSON des types restitues a l'identique
+_TUPLE_KEY = "__tuple__"
+_BYTES_KEY = "__bytes__"
+
+
+def _encode(value):
+    # Tuples et octets sont balises (l'affichage texte distingue tuple et
+    # liste), les autres objets (PngReader.LazyText, ...) gardent leur texte
+    if isinstance(value, dict):
+        return {str(key): _encode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, tuple):
+        return {_TUPLE_KEY: [_encode(item) for item in value]}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {_BYTES_KEY: bytes(value).hex()}
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def _decode_object(obj: dict):
+    if len(obj) == 1:
+        if _TUPLE_KEY in obj:
+            return tuple(obj[_TUPLE_KEY])
+        if _BYTES_KEY in obj:
+            return bytes.fromhex(obj[_BYTES_KEY])
+    return obj
+
+
+def _file_key(file: str):
+    # (device, inode, taille, mtime_ns), None si le fichier est inaccessible
+    try:
+        st = os.stat(file)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def encode_result(extension: str, metadata) -> bytes:
+    """Serialises a result for the cache (JSON, see CACHE_FORMAT)."""
+    return json.dumps([extension, _encode(metadata)], ensure_ascii=False).encode()
+
+
+def decode_result(payload: bytes) -> tuple:
+    """Inverse of encode_result(): (extension, metadata)."""
+    extension, metadata = json.loads(payload, object_hook=_decode_object)
+    return extension, metadata
+
+
+class MetadataCache:
+    """
+    Persistent cache of extraction results, stored in a SQLite file.
+
+    An entry is keyed by (device, inode, size, mtime_ns) of the file and
+    CACHE_FORMAT: an unchanged file is served from the cache after a single
+    stat(), any modification changes the key. Results are stored as JSON
+    (encode_result()). The total size of the stored results is bounded by
+    `max_size`, the least recently used entries are evicted first; the use
+    times of the hits are written in batches.
+
+    Usage:
+            with MetadataCache("scorpion.db") as cache:
+                    key, result = cache.lookup("image.png")
+                    if result is None:
+                            result = process_file("image.png")
+                            cache.store(key, result)
+
+    Args:
+            path (str): Path of the SQLite database (created if missing).
+            max_size (int): Maximum total size of the cached results, in bytes.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_CACHE_SIZE):
+        # sqlite3 n'est importe qu'avec --cache (demarrage de main.py)
+        import sqlite3
+
+        self.max_size = max_size
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(entries)")]
+        if columns and "format" not in columns:
+            # Cache d'une version sans format (resultats pickles) : abandonne
+            self.db.execute("DROP TABLE entries")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                dev INTEGER,
+                ino INTEGER,
+                size INTEGER,
+                mtime_ns INTEGER,
+                format INTEGER,
+                path TEXT,
+                payload BLOB,
+                nbytes INTEGER,
+                last_used REAL,
+                PRIMARY KEY (dev, ino, size, mtime_ns, format)
+            )
+            """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_path ON entries (path)")
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)"
+        )
+        self.total_size = self.db.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM entries"
+        ).fetchone()[0]
+        self._pending_writes = 0
+        # Cles des entrees lues depuis le dernier commit (last_used)
+        self._used = []
+
+    def _written(self):
+        self._pending_writes += 1
+        if self._pending_writes >= COMMIT_INTERVAL:
+            self.commit()
+
+    def commit(self):
+        """Writes the pending use times and commits."""
+        if self._used:
+            now = time.time()
+            self.db.executemany(
+                "UPDATE entries SET last_used = ? WHERE dev = ? AND ino = ? "
+                "AND size = ? AND mtime_ns = ? AND format = ?",
+                [(now, *key, CACHE_FORMAT) for key in self._used],
+            )
+            self._used.clear()
+        self.db.commit()
+        self._pending_writes = 0
+
+    def lookup(self, file: str):
+        """
+        Looks `file` up in the cache.
+
+        Returns:
+                tuple: (key, result). `key` identifies the current version of
+                        the file (None if it cannot be stat'ed) and is passed
+                        back to store(); `result` is the cached
+                        (file, extension, metadata) tuple, or None on a miss.
+                        Items other than paths (archive members, contents, see
+                        process_item() in utils/processing.py) are never
+                        cached: (None, None).
+        """
+        if not isinstance(file, str):
+            return None, None
+        key = _file_key(file)
+        if key is None:
+            return None, None
+
+        row = self.db.execute(
+            "SELECT payload FROM entries WHERE dev = ? AND ino = ? "
+            "AND size = ? AND mtime_ns = ? AND format = ?",
+            (*key, CACHE_FORMAT),
+        ).fetchone()
+        if row is None:
+            return key, None
+
+        self._used.append(key)
+        self._written()
+        extension, metadata = decode_result(row[0])
+        return key, (file, extension, metadata)
+
+    def store(self, key, result):
+        """
+        Stores a process_file() result under `key` (see lookup()).
+
+        Errors and aborted analyses (over the --max-bytes / --timeout
+        budget) are not cached, so that the file is retried next run. The
+        file is stat'ed again: if it was modified while being analysed, the
+        result may describe neither version and is not stored.
+        """
+        file, extension, metadata = result
+        if key is None or extension == "ERROR":
+            return
+        if isinstance(metadata, dict) and ABORTED_KEY in metadata:
+            return
+        if _file_key(file) != key:
+            return
+
+        payload = encode_result(extension, metadata)
+        path = os.path.abspath(file)
+        # Une seule version par chemin : l'ancienne entree est remplacee.
+        self._delete("path = ?", (path,))
+        self._delete(
+            "dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND format = ?",
+            (*key, CACHE_FORMAT),
+        )
+        self.db.execute(
+            "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (*key, CACHE_FORMAT, path, payload, len(payload), time.time()),
+        )
+        self.total_size += len(payload)
+        self._written()
+
+        if self.total_size > self.max_size:
+            self.evict()
+
+    def _delete(self, where: str, params):
+        removed = self.db.execute(
+            f"SELECT COALESCE(SUM(nbytes), 0) FROM entries WHERE {where}", params
+        ).fetchone()[0]
+        self.db.execute(f"DELETE FROM entries WHERE {where}", params)
+        self.total_size -= removed
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in max_size."""
+        self.commit()
+        rows = self.db.execute("SELECT rowid, nbytes FROM entries ORDER BY last_used")
+        to_remove = []
+        for rowid, nbytes in rows:
+            if self.total_size <= self.max_size:
+                break
+            to_remove.append((rowid,))
+            self.total_size -= nbytes
+        self.db.executemany("DELETE FROM entries WHERE rowid = ?", to_remove)
+        self.commit()
+
+    def invalidate(self, paths):
+        """
+        Removes the entries of the given files, and of every file below
+        the given directories (files that no longer exist included).
+
+        Returns:
+                int: Number of entries removed.
+        """
+        removed = 0
+        for path in paths:
+            path = os.path.abspath(path)
+            prefix = path.rstrip(os.sep) + os.sep
+            escaped = (
+                prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            count = self.db.execute(
+                "SELECT COUNT(*) FROM entries WHERE path = ? "
+                "OR path LIKE ? ESCAPE '\\'",
+                (path, escaped + "%"),
+            ).fetchone()[0]
+            self._delete("path = ? OR path LIKE ? ESCAPE '\\'", (path, escaped + "%"))
+            removed += count
+        self.commit()
+        return removed
+
+    def clear(self):
+        """Removes every entry."""
+        self._used.clear()
+        self.db.execute("DELETE FROM entries")
+        self.db.commit()
+        self.db.execute("VACUUM")
+        self.total_size = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
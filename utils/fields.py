@@ -0,0 +1,101 @@
+# Alias utilisables avec --fields -> cles de metadonnees correspondantes
+FIELD_ALIASES = {
+    "dimensions": ("Width", "Height", "Size (width, height)"),
+}
+
+# Cles d'etat gardees par project() meme si elles ne sont pas demandees :
+# un resultat partiel doit rester reconnaissable.
+STATUS_KEYS = ("Truncated", "Aborted")
+
+
+class FieldSelection:
+    """
+    Metadata fields requested with --fields.
+
+    A field is a metadata key at any depth ("DPI", "Frame Count", "GPSInfo",
+    "DateTimeOriginal", ...), compared case-insensitively, or an alias of
+    FIELD_ALIASES ("dimensions"). Readers call wants() before parsing an
+    optional part of the file and satisfied() to stop as soon as every
+    field has been found; project() then keeps only the requested keys.
+
+    Usage:
+            fields = FieldSelection(["dimensions", "DateTimeOriginal"])
+            fields.satisfied({"Width": 20, "Height": 10})  # False
+            fields.project(metadata)
+
+    Args:
+            fields (iterable[str]): Requested fields.
+    """
+
+    def __init__(self, fields):
+        # Un groupe par champ demande : satisfait des qu'une de ses cles est trouvee
+        self.groups = []
+        for field in fields:
+            field = field.strip()
+            if not field:
+                continue
+            aliases = FIELD_ALIASES.get(field.lower(), (field,))
+            self.groups.append(frozenset(key.lower() for key in aliases))
+        self.keys = frozenset().union(*self.groups)
+
+    def __bool__(self):
+        return bool(self.groups)
+
+    def wants(self, *keys) -> bool:
+        """True if one of the metadata keys `keys` is requested."""
+        return any(str(key).lower() in self.keys for key in keys)
+
+    def wants_other_than(self, *keys) -> bool:
+        """True if a requested field is not among the metadata keys `keys`."""
+        keys = {str(key).lower() for key in keys}
+        return any(not group & keys for group in self.groups)
+
+    def _found(self, metadata, found: set):
+        for key, value in metadata.items():
+            if value is None:
+                continue  # Pas encore connu
+            found.add(str(key).lower())
+            if isinstance(value, dict):
+                self._found(value, found)
+
+    def satisfied(self, metadata: dict) -> bool:
+        """True if every requested field is present (with a value) in `metadata`."""
+        found = set()
+        self._found(metadata, found)
+        return all(group & found for group in self.groups)
+
+    def project(self, metadata: dict) -> dict:
+        """
+        Returns `metadata` restricted to the requested keys.
+
+        A requested key is kept with its whole value; a nested dict is kept
+        with only its requested keys (e.g. {"Exif": {"DateTimeOriginal": ...}}).
+        STATUS_KEYS are always kept.
+        """
+        projected = {}
+        for key, value in metadata.items():
+            if str(key).lower() in self.keys or key in STATUS_KEYS:
+                projected[key] = value
+            elif isinstance(value, dict):
+                sub = self.project(value)
+                if sub:
+                    projected[key] = sub
+        return projected
+
+
+def parse_fields(values):
+    """
+    Builds the FieldSelection of the --fields options.
+
+    Args:
+            values (list[str]|None): Option values, each one a comma-separated
+                    list of fields (e.g. ["dimensions,DPI", "GPSInfo"]).
+
+    Returns:
+            FieldSelection|None: None if no field was given (everything is
+                    extracted).
+    """
+    if not values:
+        return None
+    fields = FieldSelection(field for value in values for field in value.split(","))
+    return fields or None
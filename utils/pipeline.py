@@ -0,0 +1,125 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Marqueur de fin de flux dans les files d'attente
+_DONE = object()
+
+
+async def run_pipeline(
+    paths,
+    read,
+    parse,
+    emit,
+    inflight=16,
+    queue_size=64,
+    size=None,
+    max_buffered=None,
+):
+    """
+    Runs an asyncio pipeline that overlaps file reads with parsing.
+
+    Three stages connected by bounded queues:
+            - producer: pulls paths from `paths` (in a thread, a directory
+              walk may block) and feeds the path queue;
+            - readers: `inflight` tasks calling read(path) in a thread pool,
+              so up to `inflight` open()/read() are pending at once;
+            - parser: calls parse(path, data) on the event loop as soon as
+              data is available, then emit(result).
+
+    While the parser works, the reader threads keep waiting on I/O, so I/O
+    latency (NFS, slow disks) hides behind CPU work. Memory is bounded by
+    the queue sizes: at most `queue_size` read results wait to be parsed.
+    With `max_buffered`, a read only starts once size(path) bytes fit in
+    that budget, shared by the reads in progress and the data waiting to
+    be parsed, so large files cannot pile up in the queues.
+    Results are emitted in completion order.
+
+    Args:
+            paths (iterable[str]): Files to process (may be a lazy generator).
+            read (callable): read(path) -> data, run in a worker thread.
+                    An OSError is passed to parse() instead of the data.
+            parse (callable): parse(path, data) -> result.
+            emit (callable): Called with each result, on the event loop.
+            inflight (int): Maximum number of concurrent reads.
+            queue_size (int): Size of the path queue and of the data queue.
+            size (callable|None): size(path) -> bytes that read(path) will
+                    return, run in a worker thread (required with
+                    `max_buffered`).
+            max_buffered (int|None): Maximum number of bytes read and not
+                    parsed yet. A file larger than that is read alone.
+    """
+    loop = asyncio.get_running_loop()
+    path_queue = asyncio.Queue(queue_size)
+    data_queue = asyncio.Queue(queue_size)
+    buffered = 0
+    space = asyncio.Condition()
+
+    async def reserve(executor, path) -> int:
+        nonlocal buffered
+        if max_buffered is None:
+            return 0
+        try:
+            amount = await loop.run_in_executor(executor, size, path)
+        except OSError:
+            return 0  # L'erreur est signalee par read()
+        amount = min(amount, max_buffered)
+        async with space:
+            await space.wait_for(lambda: buffered + amount <= max_buffered)
+            buffered += amount
+        return amount
+
+    async def release(amount: int):
+        nonlocal buffered
+        if amount:
+            async with space:
+                buffered -= amount
+                space.notify_all()
+
+    async def produce(executor):
+        iterator = iter(paths)
+        while True:
+            path = await loop.run_in_executor(executor, next, iterator, _DONE)
+            if path is _DONE:
+                break
+            await path_queue.put(path)
+        for _ in range(inflight):
+            await path_queue.put(_DONE)
+
+    async def read_files(executor):
+        while (path := await path_queue.get()) is not _DONE:
+            amount = await reserve(executor, path)
+            try:
+                data = await loop.run_in_executor(executor, read, path)
+            except OSError as e:
+                data = e
+            await data_queue.put((path, data, amount))
+        await data_queue.put(_DONE)
+
+    async def parse_data():
+        finished = 0
+        while finished < inflight:
+            item = await data_queue.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            path, data, amount = item
+            emit(parse(path, data))
+            # Le contenu est libere avant d'autoriser d'autres lectures
+            del item, data
+            await release(amount)
+
+    # Un thread de plus pour le producteur
+    with ThreadPoolExecutor(inflight + 1) as executor:
+        tasks = [
+            asyncio.create_task(produce(executor)),
+            *(asyncio.create_task(read_files(executor)) for _ in range(inflight)),
+            asyncio.create_task(parse_data()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Erreur en sortie (ex: pipe ferme) : les autres etapes sont
+            # bloquees sur des files pleines, on les arrete.
+            for task in tasks:
+                task.cancel()
+            raise
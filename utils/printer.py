@@ -1,22 +1,299 @@
-def print_metadata(filename, extension, metadata):
-    print("\n================================")
-    print(f"Extractor Metadata from {extension} file -> {filename}")
-    print("================================")
+import csv
+import io
+import json
+import sys
+
+from metadata_readers.BmpTags import COLOR_SPACES, COMPRESSIONS, RENDERING_INTENTS
+
+OUTPUT_FORMATS = ("text", "jsonl", "csv")
+
+
+# Converts a byte size to a human-readable string (KB, MB, GB, TB),
+# and also shows the raw byte count.
+# Args:
+#   bytes_size (int): Size in bytes.
+# Returns:
+#   str: Example: "1.2 MB (1200000 bytes)"
+def format_size(bytes_size):
+    if bytes_size >= 1_000_000_000_000:
+        size_str = f"{bytes_size / 1_000_000_000_000:.1f} TB"
+    elif bytes_size >= 1_000_000_000:
+        size_str = f"{bytes_size / 1_000_000_000:.1f} GB"
+    elif bytes_size >= 1_000_000:
+        size_str = f"{bytes_size / 1_000_000:.1f} MB"
+    elif bytes_size >= 1_000:
+        size_str = f"{bytes_size / 1_000:.1f} KB"
+    else:
+        size_str = f"{bytes_size} bytes"
+    return f"{size_str} ({bytes_size} bytes)"
+
+
+def _all_if_zero(value):
+    return "all" if value == 0 else value
+
+
+def _no_correction_if_zero(value):
+    return "No correction" if value == 0 else value
+
+
+def _format_icc_profile(profile: dict) -> str:
+    if profile["Size"]:
+        return (
+            f"ICC Profile embedded at offset {profile['Offset']}, "
+            f"size {profile['Size']} bytes"
+        )
+    return "ICC Profile: No profile embedded; standard sRGB is used."
+
+
+# Mise en forme du texte lisible, par format puis par cle : les lecteurs
+# renvoient des valeurs brutes (entiers), gardees telles quelles en JSON / CSV.
+TEXT_FORMATTERS = {
+    "BMP": {
+        "HeaderSize": lambda size: f"BMP Info Header Size: {size} bytes",
+        "Compression": lambda code: COMPRESSIONS.get(code, "Unknown compression type"),
+        "ColorsUsed": _all_if_zero,
+        "ColorsImportant": _all_if_zero,
+        "Masks": lambda masks: ", ".join(
+            f"{name}: 0x{mask:08X}" for name, mask in masks.items()
+        ),
+        "AlphaMask": lambda mask: f"AlphaMask: 0x{mask:08X}",
+        "ColorSpace": lambda cs_type: (
+            f"Color Space Type: 0x{cs_type:08X} "
+            f"({COLOR_SPACES.get(cs_type, 'Unknown Color Space Type')})"
+        ),
+        "Endpoints": lambda endpoints: [
+            f"X:{x}, Y:{y}, Z:{z}" for x, y, z in endpoints
+        ],
+        "GammaRed": _no_correction_if_zero,
+        "GammaGreen": _no_correction_if_zero,
+        "GammaBlue": _no_correction_if_zero,
+        "RenderingIntent": lambda intent: RENDERING_INTENTS.get(intent, intent),
+        "ICCProfile": _format_icc_profile,
+    },
+}
+
+
+def format_metadata(filename, extension, metadata) -> str:
+    lines = [
+        "\n================================",
+        f"Extractor Metadata from {extension} file -> {filename}",
+        "================================",
+    ]
+    formatters = TEXT_FORMATTERS.get(extension, {})
     for key, value in metadata.items():
+        if key in formatters:
+            value = formatters[key](value)
         if isinstance(value, dict):
-            print(f"{key}:")
+            lines.append(f"{key}:")
             for sub_key, sub_value in value.items():
                 if isinstance(sub_value, dict):
-                    print(f"  {sub_key}:")
+                    lines.append(f"  {sub_key}:")
                     for sub_sub_key, sub_sub_value in sub_value.items():
-                        print(f"    {sub_sub_key}: {sub_sub_value}")
+                        lines.append(f"    {sub_sub_key}: {sub_sub_value}")
                 else:
-                    print(f"  {sub_key}: {sub_value}")
+                    lines.append(f"  {sub_key}: {sub_value}")
         elif isinstance(value, list):
-            print(f"{key}:")
+            lines.append(f"{key}:")
             for item in value:
-                print(f"  - {item}")
+                lines.append(f"  - {item}")
         else:
-            print(f"{key}: {value}")
+            lines.append(f"{key}: {value}")
+
+    lines.append("\n\n")
+    return "\n".join(lines)
+
+
+def print_metadata(filename, extension, metadata):
+    print(format_metadata(filename, extension, metadata), end="")
+
+
+def _json_default(value):
+    # Types non serialisables nativement : octets, LazyText, objets divers
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+def json_record(file, extension, metadata, event=None) -> dict:
+    """
+    JSON object of a process_file() result (see utils/processing.py and
+    JsonlWriter), also used for the responses of the server (utils/server.py).
+    """
+    record = {"file": file, "format": extension}
+    if event is not None:
+        record = {"event": event, **record}
+    if extension == "UNKNOWN":
+        record["error"] = "extension of file unknown"
+    elif extension == "ERROR":
+        record["error"] = metadata
+    else:
+        record["metadata"] = metadata
+    return record
+
+
+def dump_json(record: dict) -> str:
+    """Serialises a record on one line (tuples become arrays, bytes hex strings)."""
+    return json.dumps(record, ensure_ascii=False, default=_json_default)
+
+
+class MetadataWriter:
+    """
+    Writes one record per analysed file to an output stream.
+
+    Each record is rendered in memory (render()) and written with a single
+    write() call, so the cost per file does not depend on the number of
+    keys. Records are emitted as results arrive: the full result set is
+    never kept.
+
+    With --watch, each record carries the event that triggered it ("add",
+    "update", see utils/watcher.py) and deleted files are reported with
+    write_deleted().
+
+    Args:
+            stream (TextIO): Output stream (sys.stdout by default).
+            events (bool): Records carry an event (--watch).
+    """
+
+    def __init__(self, stream=None, events: bool = False):
+        self.stream = stream or sys.stdout
+        self.events = events
+
+    def render(self, file: str, extension: str, metadata, event=None) -> str:
+        """
+        Returns the text of the record of a process_file() result.
+
+        For "UNKNOWN" and "ERROR" extensions, metadata is None or the
+        error message.
+        """
+        raise NotImplementedError
+
+    def render_deleted(self, file: str) -> str:
+        """Returns the text of a "delete" event (--watch)."""
+        raise NotImplementedError
+
+    def write(self, file: str, extension: str, metadata, event: str | None = None):
+        """Writes the record of a process_file() result."""
+        self.stream.write(self.render(file, extension, metadata, event))
+
+    def write_deleted(self, file: str):
+        self.stream.write(self.render_deleted(file))
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TextWriter(MetadataWriter):
+    """Human readable output (same layout as print_metadata)."""
+
+    def render(self, file, extension, metadata, event=None):
+        if extension == "UNKNOWN":
+            text = f"Error while extracting {file}, extension of file unknown\n"
+        elif extension == "ERROR":
+            text = f"Error while extracting {file}: {metadata}\n"
+        else:
+            text = format_metadata(file, extension, metadata)
+        if event is not None:
+            text = f"[{event}] {text.lstrip()}"
+        return text
+
+    def render_deleted(self, file):
+        return f"[delete] {file}\n"
+
+
+class JsonlWriter(MetadataWriter):
+    """
+    JSON Lines output: one JSON object per file.
+
+    {"file": ..., "format": ..., "metadata": {...}}, or "error" instead of
+    "metadata" for unknown / failed files. Tuples (EXIF rationals are
+    (numerator, denominator)) become arrays, bytes become hex strings.
+    With --watch, records start with "event", a deleted file is
+    {"event": "delete", "file": ...}.
+    """
+
+    def render(self, file, extension, metadata, event=None):
+        return dump_json(json_record(file, extension, metadata, event)) + "\n"
+
+    def render_deleted(self, file):
+        return dump_json({"event": "delete", "file": file}) + "\n"
+
+
+class CsvWriter(MetadataWriter):
+    """
+    CSV output in long format: one row per metadata value.
+
+    Columns: file, format, key, value. Nested keys are joined with dots
+    (e.g. "EXIF.GPSInfo.GPSLatitude"), list items are indexed
+    ("App Extensions.0.application"). Tuples are written as JSON arrays.
+    With --watch, an "event" column comes first; a deleted file is a
+    single row with empty format, key and value.
+
+    The header row is written when the writer is created.
+    """
+
+    HEADER = ("file", "format", "key", "value")
+
+    def __init__(self, stream=None, events: bool = False):
+        super().__init__(stream, events)
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer, lineterminator="\n")
+        self._csv.writerow(("event", *self.HEADER) if events else self.HEADER)
+        self.stream.write(self._take_rows())
+
+    def _rows(self, prefix: str, value):
+        if isinstance(value, dict):
+            for key, sub_value in value.items():
+                yield from self._rows(
+                    f"{prefix}.{key}" if prefix else str(key), sub_value
+                )
+        elif isinstance(value, list):
+            for index, item in enumerate(value):
+                yield from self._rows(f"{prefix}.{index}", item)
+        elif isinstance(value, tuple):
+            yield prefix, json.dumps(value, default=_json_default)
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            yield prefix, bytes(value).hex()
+        elif value is None:
+            yield prefix, ""
+        else:
+            yield prefix, str(value)
+
+    def render(self, file, extension, metadata, event=None):
+        prefix = (event,) if self.events else ()
+        if extension == "UNKNOWN":
+            self._csv.writerow(
+                (*prefix, file, extension, "error", "extension of file unknown")
+            )
+        elif extension == "ERROR":
+            self._csv.writerow((*prefix, file, extension, "error", metadata))
+        else:
+            for key, value in self._rows("", metadata):
+                self._csv.writerow((*prefix, file, extension, key, value))
+        return self._take_rows()
+
+    def render_deleted(self, file):
+        self._csv.writerow(("delete", file, "", "", ""))
+        return self._take_rows()
+
+    def _take_rows(self) -> str:
+        rows = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return rows
+
 
-    print("\n")
+def make_writer(
+    output_format: str, stream=None, events: bool = False
+) -> MetadataWriter:
+    """Returns the writer for an output format (see OUTPUT_FORMATS)."""
+    writers = {"text": TextWriter, "jsonl": JsonlWriter, "csv": CsvWriter}
+    return writers[output_format](stream, events)
@@ -0,0 +1,270 @@
+import time
+from collections import deque
+
+from metadata_readers.registry import get_extractor, identify_format
+from utils.archive import ArchiveMember, open_member, release_member
+from utils.budget import ABORTED_KEY, BudgetedSource, BudgetExceeded
+from utils.source import ByteSource, BytesSource, FileSource, open_source
+
+
+def identify_file_type(data: bytes):
+    # `data` n'a besoin de contenir que les premiers octets du fichier
+    # (voir HEADER_PREFIX_SIZE dans utils/source.py).
+    return identify_format(data)
+
+
+def process_source(source: ByteSource, file: str, fields=None, budget=None) -> tuple:
+    """
+    Same as process_file() for an already opened source (utils/source.py),
+    reported under the name `file`. The source is not closed.
+    """
+    extension = "UNKNOWN"
+    try:
+        extension = identify_file_type(source.prefix())
+        if extension == "UNKNOWN":
+            return file, extension, None
+        if budget is not None:
+            source = BudgetedSource(source, budget.start())
+        metadata = get_extractor(extension)(source, file, fields=fields)
+        return file, extension, metadata
+    except BudgetExceeded as e:
+        return file, extension, {ABORTED_KEY: e.as_dict()}
+    except Exception as e:
+        return file, "ERROR", f"{type(e).__name__}: {e}"
+
+
+def process_file(file: str, fields=None, budget=None) -> tuple:
+    """
+    Detects the format of a file and extracts its metadata.
+
+    This is the unit of work sent to the worker processes with --jobs, so
+    it never raises: a corrupt file is reported as an "ERROR" result and
+    the rest of the batch goes on.
+
+    Args:
+            file (str): Path of the file.
+            fields (FieldSelection|None): Requested fields (utils/fields.py),
+                    readers stop parsing once they have found them.
+            budget (ParseBudget|None): Per-file read / time limits
+                    (utils/budget.py).
+
+    Returns:
+            tuple: (file, extension, metadata). For "ERROR", metadata is the
+                    error message. A file over its budget gives
+                    {"Aborted": {"Reason": ..., "Bytes Read": ...,
+                    "Elapsed (ms)": ...}}, possibly next to the metadata
+                    found before the limit (GIF).
+    """
+    try:
+        with open(file, "rb") as f, open_source(f, file) as source:
+            return process_source(source, file, fields, budget)
+    except Exception as e:
+        return file, "ERROR", f"{type(e).__name__}: {e}"
+
+
+def profile_file(file: str, fields=None, budget=None) -> tuple:
+    """
+    process_file() with per-stage timings, for --profile.
+
+    Stages (perf_counter_ns, nanoseconds):
+            - open: open() + source creation (mmap);
+            - identify: signature read + identify_file_type();
+            - load: reader lookup, i.e. the lazy import of the reader module
+              on the first file of a format;
+            - parse: the reader itself. With a mapped file, page faults on
+              the content are counted here rather than in "open".
+
+    Returns:
+            tuple: (result, timings). `timings` maps the stages that ran to
+                    their duration.
+    """
+    timings = {}
+    clock = time.perf_counter_ns
+    stage, start = "open", clock()
+    try:
+        with open(file, "rb") as f, open_source(f, file) as source:
+            now = clock()
+            timings["open"], start, stage = now - start, now, "identify"
+            extension = identify_file_type(source.prefix())
+            now = clock()
+            timings["identify"], start, stage = now - start, now, "load"
+            if extension == "UNKNOWN":
+                return (file, extension, None), timings
+            extractor = get_extractor(extension)
+            now = clock()
+            timings["load"], start, stage = now - start, now, "parse"
+            if budget is not None:
+                source = BudgetedSource(source, budget.start())
+            metadata = extractor(source, file, fields=fields)
+            timings["parse"] = clock() - start
+            return (file, extension, metadata), timings
+    except BudgetExceeded as e:
+        timings["parse"] = clock() - start
+        return (file, extension, {ABORTED_KEY: e.as_dict()}), timings
+    except Exception as e:
+        # L'etape en echec est comptee jusqu'a l'exception
+        timings.setdefault(stage, clock() - start)
+        return (file, "ERROR", f"{type(e).__name__}: {e}"), timings
+
+
+def project_result(result: tuple, fields) -> tuple:
+    """Keeps only the requested fields of a process_file() result."""
+    file, extension, metadata = result
+    if fields is None or extension in ("UNKNOWN", "ERROR"):
+        return result
+    return file, extension, fields.project(metadata)
+
+
+def process_data(file: str, data, fields=None, budget=None) -> tuple:
+    """
+    Parse stage of the --async pipeline: same result as process_file(),
+    from the content read by read_file() (or the exception it raised).
+    """
+    if isinstance(data, Exception):
+        return file, "ERROR", f"{type(data).__name__}: {data}"
+    if data is None:
+        return process_file(file, fields, budget)
+    return process_source(BytesSource(data, file), file, fields, budget)
+
+
+def process_content(name: str, data, fields=None, budget=None) -> tuple:
+    """
+    Same as process_file() for a content that does not come from a file on
+    disk (archive member, bytes sent to the server or to scorpion.extract()).
+
+    `name` is only reported in the result: the source has no path, so the
+    readers never try to read the file again (see PngReader.LazyText).
+    """
+    return process_source(BytesSource(data), name, fields, budget)
+
+
+def process_member(member: ArchiveMember, fields=None, budget=None) -> tuple:
+    """
+    Same as process_file() for a file stored in a zip or uncompressed tar
+    archive (--archives): only the bytes needed by the reader are read
+    (and decompressed) from the archive. The temporary copy of a large
+    member of a compressed tar is removed afterwards.
+    """
+    name = str(member)
+    try:
+        with open_member(member) as f:
+            return process_source(
+                FileSource(f, None, member.size), name, fields, budget
+            )
+    except Exception as e:
+        return name, "ERROR", f"{type(e).__name__}: {e}"
+    finally:
+        release_member(member)
+
+
+def process_item(item, fields=None, budget=None) -> tuple:
+    """
+    Worker of process_files() for mixed inputs: paths, archive members and
+    (name, content) pairs (see utils/archive.py).
+
+    The content of a pair may be the exception raised while reading it,
+    reported as an "ERROR" result.
+    """
+    if isinstance(item, ArchiveMember):
+        return process_member(item, fields, budget)
+    if isinstance(item, tuple):
+        name, data = item
+        if isinstance(data, Exception):
+            return process_data(name, data)
+        return process_content(name, data, fields, budget)
+    return process_file(item, fields, budget)
+
+
+def _submit(pool, file: str, cache, fields, budget=None, worker=process_file):
+    """
+    Sends a file to the pool, unless its result is in the cache.
+
+    Returns:
+            tuple: (future, key). `key` is the cache key to store the result
+                    under, None when there is nothing to store.
+    """
+    if cache is not None:
+        key, result = cache.lookup(file)
+        if result is not None:
+            from concurrent.futures import Future
+
+            future = Future()
+            future.set_result(result)
+            return future, None
+    else:
+        key = None
+    return pool.submit(worker, file, fields, budget), key
+
+
+def _collect(future, key, cache):
+    result = future.result()
+    if key is not None:
+        cache.store(key, result)
+    return result
+
+
+def process_files(
+    files,
+    jobs: int = 1,
+    ordered: bool = True,
+    cache=None,
+    fields=None,
+    budget=None,
+    worker=process_file,
+):
+    """
+    Yields process_file() results for every file.
+
+    With jobs > 1 the files are dispatched to a pool of processes; results
+    come back in input order, or as soon as they complete if `ordered`
+    is False. At most `jobs * 4` files are in flight, so `files` can be a
+    lazy generator of any length (see utils/walker.py).
+
+    With a MetadataCache (utils/cache.py), unchanged files are answered
+    from the cache without being opened, and new results are stored.
+
+    `fields` is passed to the readers, which may then return more than the
+    requested fields but stop early (see project_result()). With a cache,
+    files are always fully extracted so that the stored results are
+    complete. `budget` (utils/budget.py) limits the analysis of each file.
+
+    `worker` replaces process_file() (e.g. process_item() for archive
+    members, or profile_file(), whose results are (result, timings) tuples
+    and cannot be combined with a cache).
+    """
+    if cache is not None:
+        fields = None
+    if jobs == 1:
+        for file in files:
+            key, result = cache.lookup(file) if cache is not None else (None, None)
+            if result is None:
+                result = worker(file, fields, budget)
+                if key is not None:
+                    cache.store(key, result)
+            yield result
+        return
+
+    # concurrent.futures (et multiprocessing) seulement avec --jobs > 1
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    window = jobs * 4
+    with ProcessPoolExecutor(jobs) as pool:
+        if ordered:
+            pending = deque()
+            for file in files:
+                pending.append(_submit(pool, file, cache, fields, budget, worker))
+                if len(pending) >= window:
+                    yield _collect(*pending.popleft(), cache)
+            while pending:
+                yield _collect(*pending.popleft(), cache)
+        else:
+            pending = {}
+            for file in files:
+                future, key = _submit(pool, file, cache, fields, budget, worker)
+                pending[future] = key
+                if len(pending) >= window:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield _collect(future, pending.pop(future), cache)
+            for future in wait(pending).done:
+                yield _collect(future, pending[future], cache)
@@ -0,0 +1,141 @@
+import json
+
+# Etapes mesurees pour chaque fichier, dans l'ordre du pipeline
+STAGES = ("open", "identify", "load", "parse", "output")
+
+PROFILE_FORMATS = ("table", "json")
+
+# Buckets de l'histogramme : 4 par puissance de 2 de nanosecondes
+# (precision de 25%), jusqu'a 2**64 ns.
+HISTOGRAM_BUCKETS = 4 * 63
+
+
+def _bucket(ns: int) -> int:
+    # Bit de poids fort + les 2 bits suivants ; exact en dessous de 8 ns
+    if ns < 8:
+        return ns
+    shift = ns.bit_length() - 3
+    return 4 * shift + (ns >> shift)
+
+
+def _bucket_limit(bucket: int) -> int:
+    # Borne superieure (exclue) des durees d'un bucket
+    if bucket < 8:
+        return bucket + 1
+    shift, mantissa = divmod(bucket, 4)
+    return (mantissa + 5) << (shift - 1)
+
+
+class Histogram:
+    """
+    Histogram of durations in nanoseconds, in log-linear buckets (four
+    per power of two).
+
+    Memory does not depend on the number of samples: percentiles are
+    estimated from the buckets (upper bound of the bucket, at most 25%
+    off), count / total / min / max are exact.
+    """
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, ns: int):
+        self.count += 1
+        self.total += ns
+        self.min = ns if self.min is None else min(self.min, ns)
+        self.max = max(self.max, ns)
+        self.buckets[min(_bucket(ns), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, p: int) -> int:
+        """Upper bound (ns) of the bucket holding the p-th percentile."""
+        rank = max(1, -(-p * self.count // 100))
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(_bucket_limit(bucket), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": self.total / 1e6,
+            "mean_us": self.total / self.count / 1e3 if self.count else 0,
+            "min_us": (self.min or 0) / 1e3,
+            "p50_us": self.percentile(50) / 1e3,
+            "p90_us": self.percentile(90) / 1e3,
+            "p99_us": self.percentile(99) / 1e3,
+            "max_us": self.max / 1e3,
+            "buckets": {
+                f"<{_bucket_limit(i)}ns": count
+                for i, count in enumerate(self.buckets)
+                if count
+            },
+        }
+
+
+class StageProfiler:
+    """
+    Aggregates per-file stage timings (see profile_file() in utils/processing.py) by format and stage.
+
+    Usage:
+            profiler = StageProfiler()
+            profiler.add("PNG", {"open": 12000, "parse": 250000, ...})
+            profiler.report(sys.stderr, "table")
+    """
+
+    def __init__(self):
+        # (format, etape) -> Histogram
+        self.histograms = {}
+        self.files = 0
+
+    def add(self, file_format: str, timings: dict):
+        self.files += 1
+        for stage, ns in timings.items():
+            histogram = self.histograms.get((file_format, stage))
+            if histogram is None:
+                histogram = self.histograms[(file_format, stage)] = Histogram()
+            histogram.add(ns)
+
+    def _sorted_keys(self):
+        return sorted(
+            self.histograms,
+            key=lambda key: (key[0], STAGES.index(key[1]) if key[1] in STAGES else 99),
+        )
+
+    def as_dict(self, elapsed_ns: int | None = None) -> dict:
+        formats = {}
+        for file_format, stage in self._sorted_keys():
+            summary = self.histograms[(file_format, stage)].summary()
+            formats.setdefault(file_format, {})[stage] = summary
+        report = {"files": self.files, "formats": formats}
+        if elapsed_ns is not None:
+            report["elapsed_ms"] = elapsed_ns / 1e6
+        return report
+
+    def report(self, stream, output_format: str = "table", elapsed_ns=None):
+        """Writes the summary to `stream`, as a table or a JSON object."""
+        if output_format == "json":
+            stream.write(json.dumps(self.as_dict(elapsed_ns)) + "\n")
+            return
+
+        columns = ("count", "total_ms", "mean_us", "p50_us", "p90_us", "p99_us")
+        lines = ["", f"Profile: {self.files} files"]
+        if elapsed_ns is not None:
+            lines[-1] += f" in {elapsed_ns / 1e6:.1f} ms"
+        lines.append(
+            f"{'format':<10}{'stage':<10}" + "".join(f"{c:>12}" for c in columns)
+        )
+        for file_format, stage in self._sorted_keys():
+            summary = self.histograms[(file_format, stage)].summary()
+            values = f"{summary['count']:>12}" + "".join(
+                f"{summary[c]:>12.1f}" for c in columns[1:]
+            )
+            lines.append(f"{file_format:<10}{stage:<10}{values}")
+        stream.write("\n".join(lines) + "\n")
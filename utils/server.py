@@ -0,0 +1,344 @@
+import asyncio
+import base64
+import json
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.fields import parse_fields
+from utils.printer import OUTPUT_FORMATS, dump_json, json_record, make_writer
+
+# Attente du client quand toutes ses requetes ont ete refusees (server busy)
+BUSY_RETRY_DELAY = 0.05
+# Taille maximale d'une requete (une ligne JSON, contenu base64 compris)
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+BUSY_ERROR = "server busy"
+
+
+class ExtractionServer:
+    """
+    Resident extraction server over a Unix domain socket (`main.py serve`).
+
+    Worker processes are started and warmed up (readers imported) once,
+    then every request only pays for its own parsing. The protocol is JSON
+    Lines in both directions, several requests may be in flight on one
+    connection and responses come back as they complete:
+
+            request:  {"id": 1, "path": "/abs/image.jpg", "name": "image.jpg"}
+                      {"id": 2, "name": "upload.png", "data": "<base64>"}
+                      optional: "fields": ["dimensions", ...] (see --fields),
+                      "render": "text" | "jsonl" | "csv", "name" (file name
+                      shown in the response, defaults to the path)
+            response: {"id": 1, "file": ..., "format": ..., "metadata": {...}}
+                      ("error" instead of "metadata", as with --format jsonl)
+                      {"id": 2, "output": "..."} with "render": the record
+                      as printed by the CLI writer of that format
+                      {"id": 3, "error": "server busy"} when the queue is full
+
+    At most `jobs` files are parsed at once and `queue_size` more wait for
+    a worker; further requests are refused with "server busy" (the client
+    retries), so a burst cannot grow the memory of the server.
+
+    Args:
+            socket_path (str): Path of the Unix socket (created with mode 0600:
+                    path requests read files with the rights of the server).
+            process_path (callable): process_path(path, fields, budget) ->
+                    result, run in the workers (process_file() of
+                    utils/processing.py).
+            process_bytes (callable): process_bytes(name, data, fields, budget)
+                    -> result (process_content()).
+            project (callable): project(result, fields) -> result
+                    (project_result()).
+            jobs (int): Number of worker processes.
+            queue_size (int): Requests waiting for a worker.
+            budget (ParseBudget|None): Per-file limits (utils/budget.py).
+            initializer (callable|None): Run once in each worker.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        process_path,
+        process_bytes,
+        project,
+        jobs: int = 1,
+        queue_size: int = 64,
+        budget=None,
+        initializer=None,
+    ):
+        self.socket_path = socket_path
+        self.process_path = process_path
+        self.process_bytes = process_bytes
+        self.project = project
+        self.jobs = jobs
+        self.queue_size = queue_size
+        self.budget = budget
+        self.initializer = initializer
+        self.pending = 0
+        self._renderers = {}
+        self._pool = None
+
+    def _render(self, output_format: str, result) -> str:
+        # Un writer par format, sur un tampon : seul render() est utilise
+        writer = self._renderers.get(output_format)
+        if writer is None:
+            writer = self._renderers[output_format] = make_writer(
+                output_format, _Discard()
+            )
+        return writer.render(*result)
+
+    def _parse_request(self, request) -> tuple:
+        # (fonction, arguments, fields, nom affiche, format de rendu)
+        if not isinstance(request, dict):
+            raise ValueError("not an object")
+        fields = request.get("fields")
+        if isinstance(fields, str):
+            fields = [fields]
+        fields = parse_fields(fields)
+        output_format = request.get("render")
+        if output_format is not None and output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"unknown render format: {output_format}")
+        name = request.get("name")
+        if "path" in request:
+            args = (str(request["path"]), fields, self.budget)
+            return self.process_path, args, fields, name, output_format
+        if "data" in request:
+            data = base64.b64decode(request["data"], validate=True)
+            name = str(name or "<data>")
+            args = (name, data, fields, self.budget)
+            return self.process_bytes, args, fields, None, output_format
+        raise ValueError("request needs 'path' or 'data'")
+
+    async def _process(self, request_id, call: tuple, send):
+        function, args, fields, name, output_format = call
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._pool, function, *args)
+        except Exception as e:  # Worker mort (BrokenProcessPool, ...)
+            await send({"id": request_id, "error": f"{type(e).__name__}: {e}"})
+            return
+        finally:
+            self.pending -= 1
+
+        if name is not None:
+            result = (str(name), *result[1:])
+        result = self.project(result, fields)
+        if output_format is not None:
+            await send(
+                {"id": request_id, "output": self._render(output_format, result)}
+            )
+        else:
+            await send({"id": request_id, **json_record(*result)})
+
+    async def _handle_connection(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def send(response: dict):
+            async with lock:
+                writer.write(dump_json(response).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    await send({"id": None, "error": "bad request: too large"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    if isinstance(request, dict):
+                        request_id = request.get("id")
+                    call = self._parse_request(request)
+                except (ValueError, TypeError, AttributeError) as e:
+                    await send({"id": request_id, "error": f"bad request: {e}"})
+                    continue
+
+                if self.pending >= self.jobs + self.queue_size:
+                    await send({"id": request_id, "error": BUSY_ERROR})
+                    continue
+                self.pending += 1
+                task = asyncio.create_task(self._process(request_id, call, send))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _start_pool(self):
+        self._pool = ProcessPoolExecutor(self.jobs, initializer=self.initializer)
+        # Demarre tous les workers maintenant (initializer compris), et non
+        # a la premiere requete
+        for future in [self._pool.submit(os.getpid) for _ in range(self.jobs)]:
+            future.result()
+
+    async def serve(self):
+        """
+        Serves until SIGINT / SIGTERM, then removes the socket.
+
+        Raises:
+                OSError: If another server listens on socket_path.
+        """
+        if os.path.exists(self.socket_path):
+            # Socket d'un serveur precedent : refuse si un serveur y repond
+            probe = socket.socket(socket.AF_UNIX)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)
+            else:
+                probe.close()
+                raise OSError(f"a server is already listening on {self.socket_path}")
+
+        self._start_pool()
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(
+                self._handle_connection, self.socket_path, limit=MAX_REQUEST_SIZE
+            )
+        finally:
+            os.umask(old_umask)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            os.unlink(self.socket_path)
+            self._pool.shutdown(cancel_futures=True)
+
+
+class _Discard:
+    # Flux des writers de rendu : l'en-tete CSV ecrit a la creation est ignore
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+class ExtractionClient:
+    """
+    Blocking client of ExtractionServer.
+
+    Usage:
+            with ExtractionClient("/run/scorpion.sock") as client:
+                    for response in client.extract_paths(paths, render="text"):
+                            ...
+
+    Args:
+            socket_path (str): Path of the server socket.
+    """
+
+    def __init__(self, socket_path: str):
+        self.sock = socket.socket(socket.AF_UNIX)
+        self.sock.connect(socket_path)
+        self._lines = self.sock.makefile("rb")
+
+    def _send(self, request: dict):
+        self.sock.sendall(json.dumps(request).encode() + b"\n")
+
+    def _receive(self) -> dict:
+        line = self._lines.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+    def extract_paths(
+        self, paths, render=None, fields=None, window: int = 16, ordered=True
+    ):
+        """
+        Sends one request per path and yields the responses (dict, see
+        ExtractionServer), in the order of `paths` if `ordered`.
+
+        At most `window` requests are in flight, responses kept to be
+        yielded in order included (a slow file holds the next ones back
+        instead of letting them pile up). A request refused with "server
+        busy" is held, and no new path is sent: each real response lets one
+        refused request be sent again (it freed one slot on the server), and
+        when no request is in flight they are all sent again after
+        BUSY_RETRY_DELAY.
+        """
+        requests = {}
+        refused = []  # Refusees, en attente d'une reponse ou du delai
+        waiting = []  # Refusees, a renvoyer
+        done = {}  # Recues en avance sur l'ordre de `paths`
+        next_id = 0
+        next_out = 0
+        paths = iter(paths)
+        exhausted = False
+
+        while True:
+            while len(requests) - len(waiting) - len(refused) + len(done) < window:
+                if waiting:
+                    request = waiting.pop(0)
+                elif refused or exhausted:
+                    break
+                else:
+                    path = next(paths, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    request = {
+                        "id": next_id,
+                        "path": os.path.abspath(path),
+                        "name": path,
+                    }
+                    if render is not None:
+                        request["render"] = render
+                    if fields:
+                        request["fields"] = fields
+                    requests[next_id] = (path, request)
+                    next_id += 1
+                self._send(request)
+            if not requests:
+                return
+
+            response = self._receive()
+            request_id = response.get("id")
+            if request_id not in requests:
+                raise ConnectionError(f"unexpected response: {response}")
+            if response.get("error") == BUSY_ERROR:
+                refused.append(requests[request_id][1])
+                # Plus rien en cours : aucune reponse a attendre, on patiente
+                if len(refused) + len(waiting) == len(requests):
+                    time.sleep(BUSY_RETRY_DELAY)
+                    waiting.extend(refused)
+                    refused.clear()
+                continue
+            # Une requete s'est terminee : une place s'est liberee sur le serveur
+            if refused:
+                waiting.append(refused.pop(0))
+            path, _ = requests.pop(request_id)
+            response["path"] = path
+            if not ordered:
+                yield response
+                continue
+            done[request_id] = response
+            while next_out in done:
+                yield done.pop(next_out)
+                next_out += 1
+
+    def close(self):
+        self._lines.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,231 @@
+import io
+import mmap
+import os
+
+# Nombre d'octets lus en tete de fichier pour identifier le format.
+# Les signatures connues font au plus 12 octets ("RIFF....WEBP").
+HEADER_PREFIX_SIZE = 16
+
+
+class ByteSource:
+    """
+    Base class for the byte sources handed to the metadata readers.
+
+    A source gives random access to the content of a file without
+    requiring the whole file to be loaded in memory. Readers only pull
+    the byte ranges they need through read().
+
+    Attributes:
+            path (str|None): Path of the underlying file, if any.
+            size (int): Total size of the content in bytes.
+            file (BinaryIO): Seekable file object over the content.
+    """
+
+    path: str | None = None
+    size: int = 0
+
+    def read(self, offset: int, size: int) -> bytes | memoryview:
+        """
+        Returns at most `size` bytes starting at `offset`.
+
+        Reads past the end of the content are truncated, like file.read().
+        Sources backed by memory return a memoryview (no copy): decode it
+        with struct.unpack_from / int.from_bytes / str(view, encoding).
+        """
+        raise NotImplementedError
+
+    def prefix(self, size: int = HEADER_PREFIX_SIZE) -> bytes:
+        """Returns the first bytes of the content (format sniffing)."""
+        return bytes(self.read(0, size))
+
+    def close(self):
+        """Releases the resources held by the source (the file itself is not closed)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FileSource(ByteSource):
+    """
+    Byte source over an already opened, seekable binary file.
+
+    Usage:
+            with open("image.bmp", "rb") as f:
+                    source = FileSource(f, "image.bmp")
+                    header = source.read(0, 14)
+
+    Args:
+            file (BinaryIO): File object opened in binary mode.
+            path (str|None): Path of the file.
+            size (int|None): Size of the content, if known. Avoids seeking
+                    to the end of the file, which decompresses a whole zip
+                    member (utils/archive.py).
+    """
+
+    def __init__(self, file, path: str | None = None, size: int | None = None):
+        self.file = file
+        self.path = path
+        if size is None:
+            size = file.seek(0, os.SEEK_END)
+            file.seek(0)
+        self.size = size
+
+    def read(self, offset: int, size: int) -> bytes:
+        self.file.seek(offset)
+        return self.file.read(size)
+
+
+# Taille par defaut du tampon de lecture de StreamWindow
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+class StreamWindow:
+    """
+    Indexable, read-only view over a file through a fixed-size buffer.
+
+    Supports data[i] and data[a:b] like bytes, so sequential parsers can
+    walk a file of any size with constant memory. An access outside the
+    buffered window refills it with a single seek + read: blocks skipped
+    by their length (e.g. GIF image data) are seeked over, not read.
+
+    Args:
+            file (BinaryIO): Seekable binary file object.
+            size (int): Size of the file in bytes.
+            buffer_size (int): Size of the window.
+    """
+
+    def __init__(self, file, size: int, buffer_size: int = STREAM_BUFFER_SIZE):
+        self.file = file
+        self.size = size
+        self.buffer_size = buffer_size
+        self._start = 0
+        self._buffer = b""
+
+    def __len__(self):
+        return self.size
+
+    def _fill(self, offset: int):
+        self.file.seek(offset)
+        self._buffer = self.file.read(self.buffer_size)
+        self._start = offset
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, _ = key.indices(self.size)
+            if start >= stop:
+                return b""
+            if stop - start > self.buffer_size:
+                self.file.seek(start)
+                return self.file.read(stop - start)
+            if start < self._start or stop > self._start + len(self._buffer):
+                self._fill(start)
+            return self._buffer[start - self._start : stop - self._start]
+
+        index = key - self._start
+        if not 0 <= index < len(self._buffer):
+            if not 0 <= key < self.size:
+                raise IndexError("stream index out of range")
+            self._fill(key)
+            index = 0
+        return self._buffer[index]
+
+
+class BytesSource(ByteSource):
+    """
+    Byte source over content already in memory.
+
+    Args:
+            data (bytes): Content of the file.
+            path (str|None): Path of the file, if known.
+    """
+
+    def __init__(self, data: bytes, path: str | None = None):
+        self.data = data
+        self.view = memoryview(data)
+        self.path = path
+        self.size = len(data)
+        self.file = io.BytesIO(data)
+
+    def read(self, offset: int, size: int) -> memoryview:
+        return self.view[offset : offset + size]
+
+
+class MappedSource(ByteSource):
+    """
+    Byte source backed by a read-only memory mapping of the file.
+
+    read() returns memoryview slices over the mapping, so no byte is
+    copied and the pages are only loaded by the OS when a reader touches
+    them: huge files are scanned without being loaded into the heap.
+
+    Usage:
+            with open("image.gif", "rb") as f, MappedSource(f, "image.gif") as source:
+                    lsd = source.read(6, 7)
+                    width = int.from_bytes(lsd[0:2], "little")
+
+    Args:
+            file (BinaryIO): File object opened in binary mode (must have a fileno).
+            path (str|None): Path of the file.
+
+    Raises:
+            ValueError: If the file is empty (an empty file cannot be mapped).
+            OSError: If the file cannot be mapped (pipe, special file, ...).
+    """
+
+    def __init__(self, file, path: str | None = None):
+        self.file = file
+        self.path = path
+        self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self._mmap)
+        self.size = len(self._mmap)
+
+    def read(self, offset: int, size: int) -> memoryview:
+        return self.view[offset : offset + size]
+
+    def close(self):
+        try:
+            self.view.release()
+            self._mmap.close()
+        except BufferError:
+            # Des vues sur le mapping sont encore referencees (ex: dans une
+            # traceback) : le mapping sera libere avec elles par le GC.
+            pass
+
+
+def open_source(file, path: str | None = None) -> ByteSource:
+    """
+    Returns the best source for an opened binary file.
+
+    The file is memory-mapped when possible, and read through a
+    FileSource otherwise (empty file, pipe, file without fileno).
+
+    Args:
+            file (BinaryIO): File object opened in binary mode.
+            path (str|None): Path of the file.
+    """
+    try:
+        return MappedSource(file, path)
+    except (ValueError, OSError, io.UnsupportedOperation):
+        return FileSource(file, path)
+
+
+def as_source(data, path: str | None = None) -> ByteSource:
+    """
+    Wraps `data` into a ByteSource.
+
+    Args:
+            data (ByteSource|bytes|BinaryIO): Existing source, raw content,
+                    or seekable binary file object.
+            path (str|None): Path of the file, if known.
+
+    Returns:
+            ByteSource: `data` itself if it is already a source.
+    """
+    if isinstance(data, ByteSource):
+        return data
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return BytesSource(data, path)
+    return FileSource(data, path)
@@ -0,0 +1,151 @@
+import os
+from fnmatch import fnmatch
+
+# Politique de suivi des liens symboliques
+SYMLINK_POLICIES = ("skip", "files", "follow")
+
+
+def _matches(name: str, rel_path: str, patterns) -> bool:
+    return any(fnmatch(name, p) or fnmatch(rel_path, p) for p in patterns)
+
+
+def iter_files(
+    paths,
+    recursive: bool = False,
+    include=None,
+    exclude=None,
+    max_depth: int | None = None,
+    symlinks: str = "files",
+):
+    """
+    Lazily yields the regular files to analyse.
+
+    Explicit file paths are yielded as given. Directories are skipped,
+    unless `recursive` is set: they are then walked with os.scandir and
+    files are yielded as soon as they are found, so the whole tree is
+    never held in memory (only one scandir iterator per open level).
+
+    Args:
+            paths (iterable[str]): Files and/or directories.
+            recursive (bool): Walk the directories.
+            include (list[str]|None): Glob patterns, a file found in a
+                    directory is kept only if its name or relative path
+                    matches one of them.
+            exclude (list[str]|None): Glob patterns for files and
+                    directories to skip while walking.
+            max_depth (int|None): Number of sub-directory levels to descend
+                    into (0 = only the files directly in the directory,
+                    None = unlimited).
+            symlinks (str): "skip" ignores every symlink, "files" follows
+                    symlinks to files only, "follow" also follows symlinks
+                    to directories (loops are detected).
+
+    Yields:
+            str: Path of a regular file.
+    """
+    if symlinks not in SYMLINK_POLICIES:
+        raise ValueError(f"Unknown symlink policy: {symlinks}")
+    include = include or []
+    exclude = exclude or []
+
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                yield from _walk(path, include, exclude, max_depth, symlinks)
+        elif os.path.isfile(path):
+            yield path
+
+
+def is_selected(
+    path: str,
+    root: str,
+    include=None,
+    exclude=None,
+    max_depth: int | None = None,
+    symlinks: str = "files",
+    directory: bool = False,
+) -> bool:
+    """
+    Tells whether walking `root` would yield the file `path` (or descend
+    into the directory `path` with directory=True), with the same rules as
+    iter_files(..., recursive=True). The path itself is not required to
+    exist, except for the symlink check.
+
+    Used by utils/watcher.py to filter change notifications.
+    """
+    rel_path = os.path.relpath(path, root)
+    if rel_path == os.curdir or rel_path.split(os.sep, 1)[0] == os.pardir:
+        return False
+    parts = rel_path.split(os.sep)
+    depth = len(parts) if directory else len(parts) - 1
+    if max_depth is not None and depth > max_depth:
+        return False
+    if exclude:
+        for index, name in enumerate(parts):
+            if _matches(name, os.sep.join(parts[: index + 1]), exclude):
+                return False
+    if include and not directory and not _matches(parts[-1], rel_path, include):
+        return False
+    if os.path.islink(path):
+        return symlinks == "follow" or (symlinks == "files" and not directory)
+    return True
+
+
+def _walk(root: str, include, exclude, max_depth, symlinks):
+    try:
+        root_stat = os.stat(root)
+        root_it = os.scandir(root)
+    except OSError:
+        # Dossier disparu ou illisible : ignore, comme ses sous-dossiers
+        return
+    # Repertoires ouverts sur la branche courante, pour detecter les boucles
+    # de liens symboliques en mode "follow".
+    ancestors = [(root_stat.st_dev, root_stat.st_ino)]
+    stack = [(root_it, 0)]
+
+    try:
+        while stack:
+            it, depth = stack[-1]
+            try:
+                entry = next(it, None)
+            except OSError:
+                # Erreur de lecture du dossier : ses entrees restantes sont
+                # ignorees
+                entry = None
+            if entry is None:
+                it.close()
+                stack.pop()
+                ancestors.pop()
+                continue
+
+            rel_path = os.path.relpath(entry.path, root)
+            if exclude and _matches(entry.name, rel_path, exclude):
+                continue
+
+            try:
+                is_link = entry.is_symlink()
+                if is_link and symlinks == "skip":
+                    continue
+
+                if entry.is_dir(follow_symlinks=True):
+                    if is_link and symlinks != "follow":
+                        continue
+                    if max_depth is not None and depth >= max_depth:
+                        continue
+                    st = entry.stat(follow_symlinks=True)
+                    key = (st.st_dev, st.st_ino)
+                    if key in ancestors:
+                        continue
+                    sub_it = os.scandir(entry.path)
+                    ancestors.append(key)
+                    stack.append((sub_it, depth + 1))
+                elif entry.is_file(follow_symlinks=True):
+                    if include and not _matches(entry.name, rel_path, include):
+                        continue
+                    yield entry.path
+            except OSError:
+                # Entree disparue ou illisible pendant le parcours
+                continue
+    finally:
+        for it, _ in stack:
+            it.close()
@@ -0,0 +1,467 @@
+import os
+import select
+import stat
+import struct
+import sys
+import time
+
+from utils.walker import is_selected, iter_files
+
+WATCH_BACKENDS = ("auto", "inotify", "poll")
+WATCH_EVENTS = ("add", "update", "delete")
+
+# Delai sans nouvelle modification avant de traiter un fichier (secondes)
+DEFAULT_DEBOUNCE = 0.5
+# Intervalle entre deux parcours complets du mode polling (secondes)
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Masques inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+
+# struct inotify_event : wd, mask, cookie, len, puis le nom (len octets)
+INOTIFY_EVENT = struct.Struct("iIII")
+INOTIFY_READ_SIZE = 64 * 1024
+
+
+def _file_state(path: str):
+    # (mtime_ns, taille, inode) d'un fichier regulier, None s'il n'existe
+    # plus. L'inode change quand un fichier est remplace par un rename().
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class Watcher:
+    """
+    Base class of the --watch backends: turns change notifications into
+    debounced add / update / delete events.
+
+    The watcher keeps the (mtime_ns, size, inode) of every known file. A backend
+    only reports the paths that may have changed (_touch()); once a path
+    has had no notification for `debounce` seconds, it is compared with
+    its known state, which gives the event: "add" (new file), "update"
+    (content changed), "delete" (file gone), or nothing (a burst of writes
+    that left the file unchanged). Work therefore depends on the number of
+    changes, not on the size of the tree.
+
+    Usage:
+            with make_watcher(["ingest/"], recursive=True) as watcher:
+                    for path in watcher.scan():
+                            ...  # Fichiers deja presents
+                    for batch in watcher.batches():
+                            for event, path in batch:
+                                    ...
+
+    Args:
+            paths (list[str]): Files and directories to watch, as for
+                    iter_files() (directories require `recursive`).
+            recursive, include, exclude, max_depth, symlinks: Selection of
+                    the files, see utils/walker.py.
+            debounce (float): Quiet time in seconds before a changed file
+                    is reported.
+    """
+
+    def __init__(
+        self,
+        paths,
+        recursive: bool = False,
+        include=None,
+        exclude=None,
+        max_depth: int | None = None,
+        symlinks: str = "files",
+        debounce: float = DEFAULT_DEBOUNCE,
+    ):
+        self.paths = list(paths)
+        self.recursive = recursive
+        self.include = include
+        self.exclude = exclude
+        self.max_depth = max_depth
+        self.symlinks = symlinks
+        self.debounce = debounce
+        # Fichiers donnes explicitement, dossiers parcourus
+        self.files = {path for path in self.paths if os.path.isfile(path)}
+        self.roots = [path for path in self.paths if recursive and os.path.isdir(path)]
+        # chemin -> (mtime_ns, taille, inode) des fichiers connus
+        self.known = {}
+        # chemin -> instant (monotonic) de la derniere notification
+        self._pending = {}
+
+    def _selected(self, path: str) -> bool:
+        if path in self.files:
+            return True
+        return any(
+            is_selected(
+                path, root, self.include, self.exclude, self.max_depth, self.symlinks
+            )
+            for root in self.roots
+        )
+
+    def _snapshot(self) -> dict:
+        snapshot = {}
+        for path in iter_files(
+            self.paths,
+            recursive=self.recursive,
+            include=self.include,
+            exclude=self.exclude,
+            max_depth=self.max_depth,
+            symlinks=self.symlinks,
+        ):
+            state = _file_state(path)
+            if state is not None:
+                snapshot[path] = state
+        return snapshot
+
+    def scan(self) -> list:
+        """Records the files currently present and returns their paths."""
+        self.known = self._snapshot()
+        return list(self.known)
+
+    def _touch(self, path: str, now: float):
+        self._pending[path] = now
+
+    def _touch_tree(self, directory: str, now: float):
+        # Fichiers connus sous un dossier supprime, deplace ou a reparcourir
+        prefix = os.path.join(directory, "")
+        for path in self.known:
+            if path.startswith(prefix):
+                self._touch(path, now)
+
+    def _rescan(self, now: float):
+        # Parcours complet (debordement de la file inotify, polling)
+        snapshot = self._snapshot()
+        for path in snapshot.keys() | self.known.keys():
+            if snapshot.get(path) != self.known.get(path):
+                self._touch(path, now)
+
+    def _wait(self, timeout):
+        """Waits up to `timeout` seconds (None: forever) and _touch()es changed paths."""
+        raise NotImplementedError
+
+    def _classify(self, path: str):
+        state = _file_state(path) if self._selected(path) else None
+        old = self.known.get(path)
+        if state is None:
+            if old is None:
+                return None
+            del self.known[path]
+            return "delete"
+        self.known[path] = state
+        if old is None:
+            return "add"
+        return "update" if state != old else None
+
+    def batches(self):
+        """
+        Yields lists of (event, path), event in WATCH_EVENTS, as changes
+        settle. Runs until interrupted.
+        """
+        while True:
+            timeout = None
+            if self._pending:
+                deadline = min(self._pending.values()) + self.debounce
+                timeout = max(0.0, deadline - time.monotonic())
+            self._wait(timeout)
+
+            now = time.monotonic()
+            batch = []
+            for path, last in list(self._pending.items()):
+                if now - last < self.debounce:
+                    continue
+                del self._pending[path]
+                event = self._classify(path)
+                if event is not None:
+                    batch.append((event, path))
+            if batch:
+                yield batch
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PollingWatcher(Watcher):
+    """
+    Portable backend: walks the whole tree every `interval` seconds and
+    compares (mtime_ns, size, inode) with the previous walk.
+
+    Args:
+            interval (float): Seconds between two walks.
+            (other arguments: see Watcher)
+    """
+
+    def __init__(self, paths, interval: float = DEFAULT_POLL_INTERVAL, **options):
+        super().__init__(paths, **options)
+        self.interval = interval
+        self._last = {}
+        self._next_poll = 0.0
+
+    def scan(self) -> list:
+        files = super().scan()
+        self._last = dict(self.known)
+        self._next_poll = time.monotonic() + self.interval
+        return files
+
+    def _wait(self, timeout):
+        delay = self._next_poll - time.monotonic()
+        if timeout is not None and timeout < delay:
+            time.sleep(timeout)
+            return
+        time.sleep(max(0.0, delay))
+        self._next_poll = time.monotonic() + self.interval
+
+        # Compare au parcours precedent (et non a self.known) : un fichier
+        # encore en ecriture repousse son traitement a chaque parcours.
+        snapshot = self._snapshot()
+        now = time.monotonic()
+        for path in snapshot.keys() | self._last.keys():
+            if snapshot.get(path) != self._last.get(path):
+                self._touch(path, now)
+        self._last = snapshot
+
+
+def _load_libc():
+    # ctypes n'est importe que pour le backend inotify
+    import ctypes.util
+
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    # AttributeError hors de Linux (pas d'inotify dans la libc)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+def _errno() -> int:
+    import ctypes
+
+    return ctypes.get_errno()
+
+
+class InotifyWatcher(Watcher):
+    """
+    Linux backend: one inotify watch per directory (through ctypes, no
+    third-party module), notifications are read with select().
+
+    With `recursive`, sub-directories are watched with the walk rules of
+    utils/walker.py, including those created later. The parent directory
+    of an explicit file is watched for that file. On an overflow of the
+    kernel queue, the tree is walked once to catch up.
+
+    Raises:
+            OSError: If inotify is not available or a watch cannot be added
+                    (e.g. fs.inotify.max_user_watches reached).
+            AttributeError: If the C library has no inotify functions.
+    """
+
+    def __init__(self, paths, **options):
+        super().__init__(paths, **options)
+        self._libc = _load_libc()
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = _errno()
+            raise OSError(errno, f"inotify_init1: {os.strerror(errno)}")
+        # wd -> dossier surveille, et l'inverse
+        self._dirs = {}
+        self._watches = {}
+        # dossier surveille -> (device, inode), pour les boucles de liens
+        self._inodes = {}
+        # Chemin reconstruit depuis une notification -> chemin donne
+        self._aliases = {}
+        try:
+            for root in self.roots:
+                self._add_tree(root, root)
+            for path in self.files:
+                parent = os.path.dirname(path) or os.curdir
+                self._aliases[os.path.join(parent, os.path.basename(path))] = path
+                if parent not in self._watches:
+                    self._add_watch(parent)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory: str):
+        mask = WATCH_MASK
+        if self.symlinks != "follow":
+            mask |= IN_DONT_FOLLOW
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            errno = _errno()
+            raise OSError(errno, f"inotify_add_watch: {os.strerror(errno)}", directory)
+        self._dirs[wd] = directory
+        self._watches[directory] = wd
+
+    def _add_tree(self, directory: str, root: str, now=None):
+        # Surveille `directory` et ses sous-dossiers ; avec `now`, touche
+        # aussi les fichiers trouves (crees avant la pose des watches).
+        try:
+            st = os.stat(directory)
+        except OSError:
+            return
+        key = (st.st_dev, st.st_ino)
+        if key in self._inodes.values():
+            return  # Boucle de liens symboliques
+        self._add_watch(directory)
+        self._inodes[directory] = key
+        try:
+            with os.scandir(directory) as entries:
+                entries = list(entries)
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=True):
+                    if is_selected(
+                        entry.path,
+                        root,
+                        exclude=self.exclude,
+                        max_depth=self.max_depth,
+                        symlinks=self.symlinks,
+                        directory=True,
+                    ):
+                        self._add_tree(entry.path, root, now)
+                elif now is not None:
+                    self._touch(entry.path, now)
+            except OSError:
+                continue
+
+    def _remove_tree(self, directory: str, now: float):
+        # Dossier supprime ou deplace : ses fichiers connus sont a verifier
+        self._touch_tree(directory, now)
+        prefix = os.path.join(directory, "")
+        for path in [
+            p for p in self._watches if p == directory or p.startswith(prefix)
+        ]:
+            wd = self._watches.pop(path)
+            del self._dirs[wd]
+            self._inodes.pop(path, None)
+            self._libc.inotify_rm_watch(self.fd, wd)
+
+    def _root_of(self, path: str):
+        for root in self.roots:
+            rel_path = os.path.relpath(path, root)
+            if rel_path.split(os.sep, 1)[0] != os.pardir:
+                return root
+        return None
+
+    def _wait(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        data = b""
+        while True:
+            try:
+                chunk = os.read(self.fd, INOTIFY_READ_SIZE)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            data += chunk
+            if len(chunk) < INOTIFY_READ_SIZE:
+                break
+
+        now = time.monotonic()
+        pos = 0
+        while pos + INOTIFY_EVENT.size <= len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, pos)
+            name = data[pos + INOTIFY_EVENT.size : pos + INOTIFY_EVENT.size + length]
+            pos += INOTIFY_EVENT.size + length
+            self._handle(wd, mask, os.fsdecode(name.rstrip(b"\0")), now)
+
+    def _handle(self, wd: int, mask: int, name: str, now: float):
+        if mask & IN_Q_OVERFLOW:
+            self._rescan(now)
+            return
+        directory = self._dirs.get(wd)
+        if mask & IN_IGNORED:
+            if directory is not None:
+                del self._dirs[wd]
+                self._watches.pop(directory, None)
+                self._inodes.pop(directory, None)
+            return
+        if directory is None:
+            return
+        if not name:  # Le dossier surveille lui-meme (DELETE_SELF, MOVE_SELF)
+            self._touch_tree(directory, now)
+            return
+
+        path = os.path.join(directory, name)
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                root = self._root_of(path)
+                if root is not None and is_selected(
+                    path,
+                    root,
+                    exclude=self.exclude,
+                    max_depth=self.max_depth,
+                    symlinks=self.symlinks,
+                    directory=True,
+                ):
+                    try:
+                        self._add_tree(path, root, now)
+                    except OSError as e:
+                        print(f"watch: cannot watch {path}: {e}", file=sys.stderr)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._remove_tree(path, now)
+            return
+        self._touch(self._aliases.get(path, path), now)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def make_watcher(
+    paths,
+    backend: str = "auto",
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    **options,
+) -> Watcher:
+    """
+    Returns the watcher for `backend` (see WATCH_BACKENDS).
+
+    "auto" uses inotify and falls back to polling, with a warning on
+    stderr, where inotify is not available (not Linux, watch limit
+    reached, ...).
+    """
+    if backend != "poll":
+        try:
+            return InotifyWatcher(paths, **options)
+        except (OSError, AttributeError) as e:
+            if backend == "inotify":
+                raise
+            print(f"watch: inotify unavailable ({e}), polling", file=sys.stderr)
+    return PollingWatcher(paths, interval=poll_interval, **options)